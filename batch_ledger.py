@@ -0,0 +1,87 @@
+"""Persistent record of Splitwise expenses created from OpenAI batch results."""
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config import config
+from private_file import append_private_line, write_private_file
+
+logger = logging.getLogger(__name__)
+
+class BatchLedger:
+    """Records, per batch ID, the result of each custom ID whose expense was created.
+
+    Records are appended as JSON lines, one per created expense, so recording
+    stays cheap for batches of thousands of emails. Collecting a batch again
+    skips recorded custom IDs, so a retry after a partial failure does not
+    create the same expense twice.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """Initialize the batch ledger."""
+        self.path = Path(path or config.BATCH_LEDGER_PATH).expanduser()
+
+    def _load_records(self) -> List[Dict[str, Any]]:
+        """Load every record, skipping lines that cannot be read."""
+        try:
+            with open(self.path, 'r') as ledger_file:
+                lines = ledger_file.readlines()
+        except FileNotFoundError:
+            return []
+        except OSError as e:
+            logger.warning(f"Could not read batch ledger from {self.path}: {e}")
+            return []
+
+        records = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if not isinstance(record, dict) or 'batch_id' not in record:
+                logger.warning(f"Ignoring invalid batch ledger line in {self.path}")
+                continue
+            records.append(record)
+
+        return records
+
+    def load(self, batch_id: str) -> Dict[str, Dict[str, Any]]:
+        """Return the recorded results of a batch, keyed by custom ID."""
+        return {
+            record['custom_id']: record['result']
+            for record in self._load_records()
+            if record['batch_id'] == batch_id and 'custom_id' in record
+        }
+
+    def is_completed(self, batch_id: str) -> bool:
+        """Check whether every entry of a batch was created and the batch was forgotten."""
+        return any(
+            record['batch_id'] == batch_id and record.get('completed')
+            for record in self._load_records()
+        )
+
+    def record(self, batch_id: str, custom_id: str, result: Dict[str, Any]):
+        """Record the result of an expense created for a batch entry."""
+        append_private_line(self.path, json.dumps({
+            'batch_id': batch_id,
+            'custom_id': custom_id,
+            'result': result
+        }))
+
+    def forget(self, batch_id: str):
+        """Drop the per-entry records of a fully collected batch.
+
+        A one-line completion marker is kept, so the batch is not collected again.
+        """
+        records = [record for record in self._load_records() if record['batch_id'] != batch_id]
+        records.append({'batch_id': batch_id, 'completed': True})
+        write_private_file(self.path, ''.join(json.dumps(record) + '\n' for record in records))
+
+# Factory function for creating batch ledger instance
+def create_batch_ledger(path: Optional[str] = None) -> BatchLedger:
+    """Create and return a BatchLedger instance."""
+    return BatchLedger(path=path)
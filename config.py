@@ -4,8 +4,12 @@ import os
 from typing import Optional
 from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+# Load environment variables from .env file once; worker processes inherit
+# both the loaded variables and the marker, so they skip rescanning the disk
+_DOTENV_LOADED_MARKER = "_EXPENSE_FWD_DOTENV_LOADED"
+if not os.environ.get(_DOTENV_LOADED_MARKER):
+    load_dotenv()
+    os.environ[_DOTENV_LOADED_MARKER] = "1"
 
 class Config:
     """Configuration settings for the expense forwarder."""
@@ -13,6 +17,9 @@ class Config:
     # OpenAI API settings
     OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4")
+    OPENAI_MAX_REQUESTS_PER_MINUTE: int = int(os.getenv("OPENAI_MAX_REQUESTS_PER_MINUTE", "500"))
+    OPENAI_MAX_TOKENS_PER_MINUTE: int = int(os.getenv("OPENAI_MAX_TOKENS_PER_MINUTE", "30000"))
+    OPENAI_RESPONSE_CACHE_SIZE: int = int(os.getenv("OPENAI_RESPONSE_CACHE_SIZE", "2048"))
     
     # Splitwise API settings
     SPLITWISE_CLIENT_ID: Optional[str] = os.getenv("SPLITWISE_CLIENT_ID")
@@ -21,6 +28,9 @@ class Config:
     SPLITWISE_BASE_URL: str = "https://secure.splitwise.com/api/v3.0"
     SPLITWISE_AUTH_URL: str = "https://secure.splitwise.com/oauth/authorize"
     SPLITWISE_TOKEN_URL: str = "https://secure.splitwise.com/oauth/token"
+    TOKEN_STORE_PATH: str = os.getenv("TOKEN_STORE_PATH", "~/.config/expense_forwarder/token.json")
+    BATCH_LEDGER_PATH: str = os.getenv("BATCH_LEDGER_PATH", "~/.config/expense_forwarder/batches.jsonl")
+    SPLITWISE_LOOKUP_CACHE_TTL: int = int(os.getenv("SPLITWISE_LOOKUP_CACHE_TTL", "900"))
     
     # Default expense settings
     DEFAULT_CURRENCY: str = os.getenv("DEFAULT_CURRENCY", "USD")
@@ -0,0 +1,32 @@
+"""Pytest configuration for expense forwarder tests."""
+
+import cProfile
+import pytest
+
+# Profile written by --profile, viewable with snakeviz or gprof2dot
+PROFILE_OUTPUT = "tests.prof"
+
+_profiler_key = pytest.StashKey[cProfile.Profile]()
+
+def pytest_addoption(parser):
+    """Register the --profile option."""
+    parser.addoption(
+        "--profile",
+        action="store_true",
+        default=False,
+        help=f"Profile the test session with cProfile and write {PROFILE_OUTPUT}"
+    )
+
+def pytest_sessionstart(session):
+    """Start profiling when --profile is given."""
+    if session.config.getoption("profile"):
+        profiler = cProfile.Profile()
+        session.config.stash[_profiler_key] = profiler
+        profiler.enable()
+
+def pytest_sessionfinish(session, exitstatus):
+    """Stop profiling and write the stats file."""
+    profiler = session.config.stash.get(_profiler_key, None)
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(PROFILE_OUTPUT)
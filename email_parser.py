@@ -1,39 +1,43 @@
 """Email parser module using OpenAI API."""
 
+import asyncio
+import atexit
+import hashlib
+import io
 import json
 import logging
-from typing import Dict, Any
-from openai import OpenAI
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Union
+import httpx
+from pydantic import ValidationError
+from openai import (
+    OpenAI, AsyncOpenAI, RateLimitError, APIConnectionError, InternalServerError,
+    BadRequestError, AuthenticationError, PermissionDeniedError, NotFoundError
+)
 
 from config import config
-from models import EmailContent, ParsedExpense, OpenAIResponse
+from models import EmailContent, EmailParseContext, ParsedExpense, OpenAIResponse
 
 logger = logging.getLogger(__name__)
 
-class EmailParser:
-    """Parser for extracting expense information from emails using OpenAI."""
-    
-    def __init__(self):
-        """Initialize the email parser with OpenAI client."""
-        if not config.OPENAI_API_KEY:
-            raise ValueError("OpenAI API key is required")
-        
-        self.client = OpenAI(api_key=config.OPENAI_API_KEY)
-        self.model = config.OPENAI_MODEL
-    
-    def _create_expense_extraction_prompt(self, email_content: EmailContent) -> str:
-        """Create a prompt for extracting expense information from email."""
-        
-        prompt = f"""
-You are an expert at parsing email content to extract expense information for financial tracking.
+# OpenAI Batch API settings
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = "24h"
+_BATCH_TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
 
-Parse the following email and extract expense information in JSON format:
-
-EMAIL SUBJECT: {email_content.subject}
-EMAIL BODY: {email_content.body}
+# Retry settings for transient OpenAI errors on the async path. The async client
+# is built with SDK retries disabled so each attempt goes through the rate limiter.
+MAX_RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 1.0
+# Errors while a stream is being read come straight from httpx, unwrapped by the SDK.
+_RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, InternalServerError, httpx.TransportError)
 
-Extract the following information and return it as a JSON object:
-{{
+# Shared prompt sections describing the expected output for a single email.
+# Literal braces are doubled because the templates below are filled with str.format_map.
+_EXPENSE_RESPONSE_SCHEMA = """{{
     "parsed_expense": {{
         "description": "Brief description of the expense",
         "amount": float (the total amount),
@@ -47,9 +51,9 @@ Extract the following information and return it as a JSON object:
     "confidence": float (0.0 to 1.0 - how confident you are in the parsing),
     "notes": "Any additional notes about the parsing or ambiguities",
     "email_summary": "Brief 1-2 sentence summary of what this email is about"
-}}
+}}"""
 
-Guidelines:
+_PARSING_GUIDELINES = """Guidelines:
 1. Extract the main expense amount (ignore taxes, tips unless they're part of the total)
 2. For dates: Look for expense dates, due dates, bill dates, service dates (not just email dates). Parse formats like "06/06/2025", "June 6, 2025", "2025-06-06", etc.
 3. If multiple people are mentioned, add them to participants
@@ -57,90 +61,597 @@ Guidelines:
 5. Default to "equal" split unless specific amounts or percentages are mentioned
 6. If the email is clearly not about an expense, set confidence to 0.0
 7. Be conservative with confidence - only use high confidence (>0.8) if information is very clear
-8. Create a concise email summary that captures the essence of what this expense is for
+8. Create a concise email summary that captures the essence of what this expense is for"""
+
+# Prompt templates are built once at import; only the email content varies
+# between calls, which keeps the shared prefix byte-identical across requests
+_PROMPT_TEMPLATE = """
+You are an expert at parsing email content to extract expense information for financial tracking.
+
+Parse the following email and extract expense information in JSON format:
+
+EMAIL SUBJECT: {subject}
+EMAIL BODY: {body}
+
+Extract the following information and return it as a JSON object:
+""" + _EXPENSE_RESPONSE_SCHEMA + """
+
+""" + _PARSING_GUIDELINES + """
 
 Return ONLY the JSON object, no additional text.
 """
-        return prompt
+
+_MULTI_PROMPT_TEMPLATE = """
+You are an expert at parsing email content to extract expense information for financial tracking.
+
+Parse each of the following emails and extract expense information in JSON format.
+The emails are given as a JSON array of objects with "id", "subject" and "body":
+
+EMAILS: {emails_json}
+
+Return a JSON object of the form {{"results": [...]}} with exactly one entry per email.
+Each entry must contain the email's "id" and the following information:
+""" + _EXPENSE_RESPONSE_SCHEMA + """
+
+""" + _PARSING_GUIDELINES + """
+9. Parse every email independently - never combine information across emails
+
+Return ONLY the JSON object, no additional text.
+"""
+
+# Optional directory of the user's Splitwise categories. It is sent as its own
+# system message ahead of the email so the prompt prefix stays shared across
+# emails, and lets the model return the category ID directly.
+_DIRECTORY_TEMPLATE = """Splitwise directory for resolving IDs.
+
+CATEGORIES: {categories_json}
+
+In "parsed_expense", additionally return:
+    "category_id": id from CATEGORIES that best fits the expense, null if none fits
+
+Only use ids that appear in the directory."""
+
+# Multi-email request settings. The read timeout grows with the chunk because
+# the whole multi-email completion arrives in one non-streaming response.
+MULTI_EMAIL_CHUNK_SIZE = 10
+MULTI_EMAIL_MAX_TOKENS_PER_EMAIL = 400
+MULTI_EMAIL_TIMEOUT_PER_EMAIL = 15.0
+
+# Errors caused by the model or credentials rather than the emails; these fail
+# every chunk alike, so they are raised instead of being recorded as None
+_OPENAI_CONFIG_ERRORS = (BadRequestError, AuthenticationError, PermissionDeniedError, NotFoundError)
+
+# Connection pool settings shared by the OpenAI clients
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=40)
+HTTP_TIMEOUT = 30.0
+
+# Process-wide sync OpenAI client, created on first use so keep-alive
+# connections are reused across EmailParser instances. Async clients are bound
+# to the event loop that opened their connections, so each parser keeps its own
+# per loop (see EmailParser.async_client).
+_sync_client: Optional[OpenAI] = None
+
+def _get_sync_client() -> OpenAI:
+    """Return the shared synchronous OpenAI client."""
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = OpenAI(
+            api_key=config.OPENAI_API_KEY,
+            http_client=httpx.Client(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+        )
+    return _sync_client
+
+def _create_async_client() -> AsyncOpenAI:
+    """Create a pooled async OpenAI client for the running event loop."""
+    return AsyncOpenAI(
+        api_key=config.OPENAI_API_KEY,
+        max_retries=0,  # Retried by _create_completion_async
+        http_client=httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+    )
+
+@atexit.register
+def _close_clients():
+    """Close pooled connections held by the shared sync client."""
+    if _sync_client is not None:
+        _sync_client.close()
+
+# In-process LRU of raw OpenAI response content keyed by a hash of the request,
+# so retried or replayed emails skip the paid API call. Guarded by a lock since
+# parses also run in worker threads (e.g. via asyncio.to_thread).
+_response_cache: "OrderedDict[str, str]" = OrderedDict()
+_response_cache_lock = threading.Lock()
+
+def _response_cache_key(request_body: Dict[str, Any]) -> str:
+    """Hash a chat completion request body into a cache key."""
+    serialized = json.dumps(request_body, sort_keys=True).encode("utf-8")
+    return hashlib.blake2b(serialized, digest_size=16).hexdigest()
+
+def _get_cached_response(key: str) -> Optional[str]:
+    """Return cached response content and mark it as recently used."""
+    with _response_cache_lock:
+        content = _response_cache.get(key)
+        if content is not None:
+            _response_cache.move_to_end(key)
+        return content
+
+def _cache_response(key: str, content: str):
+    """Store response content, evicting the least recently used entries."""
+    if config.OPENAI_RESPONSE_CACHE_SIZE <= 0:
+        return
+    with _response_cache_lock:
+        _response_cache[key] = content
+        _response_cache.move_to_end(key)
+        while len(_response_cache) > config.OPENAI_RESPONSE_CACHE_SIZE:
+            _response_cache.popitem(last=False)
+
+class _RateLimiter:
+    """Token-bucket throttle for OpenAI request and token budgets.
+    
+    Capacity refills continuously from the per-minute limits, in the style of
+    openai-cookbook's api_request_parallel_processor.
+    """
+    
+    def __init__(self, max_requests_per_minute: int, max_tokens_per_minute: int):
+        """Initialize the rate limiter with full capacity."""
+        if max_requests_per_minute < 1 or max_tokens_per_minute < 1:
+            raise ValueError("OpenAI per-minute request and token limits must be at least 1")
+        
+        self.max_requests_per_minute = max_requests_per_minute
+        self.max_tokens_per_minute = max_tokens_per_minute
+        self.available_request_capacity = float(max_requests_per_minute)
+        self.available_token_capacity = float(max_tokens_per_minute)
+        self.last_update_time = time.monotonic()
+    
+    def _refill(self):
+        """Add capacity accrued since the last update."""
+        now = time.monotonic()
+        elapsed = now - self.last_update_time
+        self.available_request_capacity = min(
+            self.available_request_capacity + self.max_requests_per_minute * elapsed / 60.0,
+            self.max_requests_per_minute
+        )
+        self.available_token_capacity = min(
+            self.available_token_capacity + self.max_tokens_per_minute * elapsed / 60.0,
+            self.max_tokens_per_minute
+        )
+        self.last_update_time = now
     
-    async def parse_email_async(self, email_content: EmailContent) -> OpenAIResponse:
-        """Parse email content asynchronously using OpenAI API."""
+    async def acquire(self, token_estimate: int):
+        """Wait until capacity for one request of the estimated size is available."""
+        # A single request larger than the whole budget would otherwise wait forever
+        token_estimate = min(token_estimate, self.max_tokens_per_minute)
+        
+        while True:
+            self._refill()
+            if (self.available_request_capacity >= 1 and
+                    self.available_token_capacity >= token_estimate):
+                self.available_request_capacity -= 1
+                self.available_token_capacity -= token_estimate
+                return
+            await asyncio.sleep(0.1)
+
+class EmailParser:
+    """Parser for extracting expense information from emails using OpenAI."""
+    
+    def __init__(self):
+        """Initialize the email parser with OpenAI client."""
+        if not config.OPENAI_API_KEY:
+            raise ValueError("OpenAI API key is required")
+        
+        self.client = _get_sync_client()
+        # Async clients owned by this parser, one per event loop; entries for
+        # loops that have been garbage collected drop out on their own
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = weakref.WeakKeyDictionary()
+        self.model = config.OPENAI_MODEL
+        self._rate_limiter = _RateLimiter(
+            config.OPENAI_MAX_REQUESTS_PER_MINUTE,
+            config.OPENAI_MAX_TOKENS_PER_MINUTE
+        )
+    
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """This parser's async OpenAI client for the running event loop.
+        
+        Clients on other loops are left alone, so parsers can be used from
+        several threads each running its own loop.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = _create_async_client()
+            self._async_clients[loop] = client
+        return client
+    
+    async def aclose(self):
+        """Close this parser's async OpenAI client for the running event loop.
+        
+        Await this before the event loop finishes (e.g. at the end of the
+        coroutine passed to asyncio.run) so pooled connections are released.
+        """
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+    
+    def _create_expense_extraction_prompt(self, email_content: EmailContent) -> str:
+        """Create a prompt for extracting expense information from email."""
+        return _PROMPT_TEMPLATE.format_map({
+            "subject": email_content.subject,
+            "body": email_content.body
+        })
+    
+    def _create_multi_expense_extraction_prompt(self, emails: List[EmailContent]) -> str:
+        """Create a single prompt for extracting expense information from several emails."""
+        emails_json = json.dumps([
+            {"id": idx, "subject": email_content.subject, "body": email_content.body}
+            for idx, email_content in enumerate(emails)
+        ])
+        return _MULTI_PROMPT_TEMPLATE.format_map({"emails_json": emails_json})
+    
+    def _create_directory_prompt(self, context: EmailParseContext) -> str:
+        """Create the directory section listing Splitwise categories."""
+        return _DIRECTORY_TEMPLATE.format_map({
+            "categories_json": json.dumps(context.categories, separators=(",", ":"))
+        })
+    
+    def _build_messages(self, prompt: str,
+                        context: Optional[EmailParseContext] = None) -> List[Dict[str, str]]:
+        """Build the chat messages for a prompt, with the directory when a context is given."""
+        messages = [
+            {
+                "role": "system",
+                "content": "You are a financial expense parser. Return only valid JSON."
+            }
+        ]
+        if context is not None:
+            messages.append({
+                "role": "system",
+                "content": self._create_directory_prompt(context)
+            })
+        messages.append({
+            "role": "user",
+            "content": prompt
+        })
+        return messages
+    
+    def _build_request_body(self, email_content: EmailContent,
+                            context: Optional[EmailParseContext] = None) -> Dict[str, Any]:
+        """Build the chat completion request body for an email."""
+        return {
+            "model": self.model,
+            "messages": self._build_messages(self._create_expense_extraction_prompt(email_content), context),
+            "temperature": 0.1,  # Low temperature for consistent parsing
+            "max_tokens": 1000
+        }
+    
+    @staticmethod
+    def _drop_unknown_ids(response: OpenAIResponse, context: Optional[EmailParseContext]) -> OpenAIResponse:
+        """Clear a resolved category ID that does not appear in the directory the model was given."""
+        if context is None:
+            return response
+        
+        category_ids = {category.get("id") for category in context.categories}
+        expense = response.parsed_expense
+        if expense.category_id is None or expense.category_id in category_ids:
+            return response
+        
+        logger.warning(f"Ignoring category ID not found in the Splitwise directory: {expense.category_id}")
+        return response.model_copy(update={"parsed_expense": expense.model_copy(update={"category_id": None})})
+    
+    def _parse_response_content(self, content: str) -> OpenAIResponse:
+        """Parse the raw JSON content returned by OpenAI."""
         try:
-            prompt = self._create_expense_extraction_prompt(email_content)
-            
-            response = await self.client.chat.completions.acreate(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a financial expense parser. Return only valid JSON."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.1,  # Low temperature for consistent parsing
-                max_tokens=1000
-            )
+            # Decode and validate in a single pass inside pydantic-core; the LLM
+            # output is untrusted, so validation is never skipped
+            return OpenAIResponse.model_validate_json(content)
+        except ValidationError as e:
+            if any(error["type"] == "json_invalid" for error in e.errors()):
+                logger.error(f"Failed to parse OpenAI JSON response: {e}")
+                logger.error(f"Raw response: {content}")
+                raise ValueError(f"Invalid JSON response from OpenAI: {e}")
+            raise
+    
+    @staticmethod
+    def _estimate_tokens(request_body: Dict[str, Any]) -> int:
+        """Roughly estimate the tokens a request consumes (prompt + completion)."""
+        prompt_chars = sum(len(message["content"]) for message in request_body["messages"])
+        return prompt_chars // 4 + request_body["max_tokens"]
+    
+    async def _stream_completion_content(self, request_body: Dict[str, Any]) -> str:
+        """Stream one chat completion and return its content, closing the stream."""
+        stream = await self.async_client.chat.completions.create(**request_body, stream=True)
+        async with stream:
+            parts = []
+            async for chunk in stream:
+                if chunk.choices:
+                    parts.append(chunk.choices[0].delta.content or "")
+        return "".join(parts).strip()
+    
+    async def _create_completion_async(self, request_body: Dict[str, Any]) -> str:
+        """Stream a chat completion's content, throttled and retried on transient errors.
+        
+        A connection error or timeout while chunks are still arriving retries the
+        whole request, since a partial completion cannot be resumed.
+        """
+        token_estimate = self._estimate_tokens(request_body)
+        
+        for attempt in range(MAX_RETRY_ATTEMPTS):
+            await self._rate_limiter.acquire(token_estimate)
+            try:
+                return await self._stream_completion_content(request_body)
+            except _RETRYABLE_ERRORS as e:
+                if attempt == MAX_RETRY_ATTEMPTS - 1:
+                    raise
+                delay = RETRY_BASE_DELAY * 2 ** attempt
+                logger.warning(f"OpenAI request failed ({e}), retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+    
+    async def parse_email_async(self, email_content: EmailContent,
+                                context: Optional[EmailParseContext] = None) -> OpenAIResponse:
+        """Parse email content asynchronously using OpenAI API.
+        
+        When a context is given, the model also resolves the Splitwise category ID.
+        """
+        try:
+            request_body = self._build_request_body(email_content, context)
+            cache_key = _response_cache_key(request_body)
+            cached_content = _get_cached_response(cache_key)
+            if cached_content is not None:
+                logger.info("Using cached OpenAI response")
+                return self._drop_unknown_ids(self._parse_response_content(cached_content), context)
             
-            content = response.choices[0].message.content.strip()
+            # Stream the completion so chunks are consumed as they arrive and the
+            # event loop is free for other requests while the response is generated
+            content = await self._create_completion_async(request_body)
             logger.info(f"OpenAI response: {content}")
             
-            # Parse the JSON response
-            parsed_data = json.loads(content)
+            parsed = self._parse_response_content(content)
+            _cache_response(cache_key, content)
+            return self._drop_unknown_ids(parsed, context)
             
-            # Validate and create the response model
-            return OpenAIResponse(**parsed_data)
-            
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse OpenAI JSON response: {e}")
-            logger.error(f"Raw response: {content}")
-            raise ValueError(f"Invalid JSON response from OpenAI: {e}")
-        
         except Exception as e:
             logger.error(f"Error parsing email with OpenAI: {e}")
             raise
     
-    def parse_email(self, email_content: EmailContent) -> OpenAIResponse:
-        """Parse email content synchronously using OpenAI API."""
+    async def parse_emails_concurrent(self, emails: List[EmailContent], max_concurrent: int = 10,
+                                      context: Optional[EmailParseContext] = None) -> List[Union[OpenAIResponse, BaseException]]:
+        """Parse many emails concurrently with at most max_concurrent requests in flight.
+        
+        Results are returned in input order; failed entries hold the raised exception.
+        """
+        if max_concurrent < 1:
+            raise ValueError(f"max_concurrent must be at least 1, got {max_concurrent}")
+        
+        semaphore = asyncio.Semaphore(max_concurrent)
+        
+        async def parse_one(email_content: EmailContent) -> OpenAIResponse:
+            async with semaphore:
+                return await self.parse_email_async(email_content, context)
+        
+        return await asyncio.gather(
+            *(parse_one(email_content) for email_content in emails),
+            return_exceptions=True
+        )
+    
+    def parse_email(self, email_content: EmailContent,
+                    context: Optional[EmailParseContext] = None) -> OpenAIResponse:
+        """Parse email content synchronously using OpenAI API.
+        
+        When a context is given, the model also resolves the Splitwise category ID.
+        """
         try:
-            prompt = self._create_expense_extraction_prompt(email_content)
+            request_body = self._build_request_body(email_content, context)
+            cache_key = _response_cache_key(request_body)
+            cached_content = _get_cached_response(cache_key)
+            if cached_content is not None:
+                logger.info("Using cached OpenAI response")
+                return self._drop_unknown_ids(self._parse_response_content(cached_content), context)
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a financial expense parser. Return only valid JSON."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.1,  # Low temperature for consistent parsing
-                max_tokens=1000
-            )
+            response = self.client.chat.completions.create(**request_body)
             
             content = response.choices[0].message.content.strip()
             logger.info(f"OpenAI response: {content}")
             
-            # Parse the JSON response
-            parsed_data = json.loads(content)
+            parsed = self._parse_response_content(content)
+            _cache_response(cache_key, content)
+            return self._drop_unknown_ids(parsed, context)
             
-            # Validate and create the response model
-            return OpenAIResponse(**parsed_data)
-            
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse OpenAI JSON response: {e}")
-            logger.error(f"Raw response: {content}")
-            raise ValueError(f"Invalid JSON response from OpenAI: {e}")
-        
         except Exception as e:
             logger.error(f"Error parsing email with OpenAI: {e}")
             raise
     
+    def _parse_email_chunk(self, emails: List[EmailContent],
+                           context: Optional[EmailParseContext] = None) -> Dict[int, OpenAIResponse]:
+        """Parse one chunk of emails in a single JSON-mode request, keyed by position."""
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=self._build_messages(self._create_multi_expense_extraction_prompt(emails), context),
+            response_format={"type": "json_object"},
+            temperature=0.1,  # Low temperature for consistent parsing
+            max_tokens=MULTI_EMAIL_MAX_TOKENS_PER_EMAIL * len(emails),
+            timeout=HTTP_TIMEOUT + MULTI_EMAIL_TIMEOUT_PER_EMAIL * len(emails)
+        )
+        
+        content = response.choices[0].message.content.strip()
+        logger.info(f"OpenAI multi-email response: {content}")
+        
+        results: Dict[int, OpenAIResponse] = {}
+        for entry in json.loads(content).get("results", []):
+            if not isinstance(entry, dict):
+                logger.warning(f"Ignoring multi-email result that is not an object: {entry!r}")
+                continue
+            
+            email_id = entry.pop("id", None)
+            if not isinstance(email_id, int) or not 0 <= email_id < len(emails):
+                logger.warning(f"Ignoring multi-email result with unknown id: {email_id}")
+                continue
+            
+            try:
+                results[email_id] = OpenAIResponse(**entry)
+            except Exception as e:
+                logger.error(f"Invalid multi-email result for id {email_id}: {e}")
+        
+        return results
+    
+    def parse_email_multi(self, emails: List[EmailContent],
+                          chunk_size: int = MULTI_EMAIL_CHUNK_SIZE,
+                          context: Optional[EmailParseContext] = None) -> List[Optional[OpenAIResponse]]:
+        """Parse several emails per request so the shared instructions are only sent once per chunk.
+        
+        Uses JSON mode, so the configured model must support response_format.
+        Results are returned in input order; entries that failed are None.
+        Model or credential errors (e.g. a model without JSON mode) are raised.
+        
+        Responses are cached under the same keys as parse_email, so an email
+        already parsed either way is not sent again. When a context is given,
+        the model also resolves the Splitwise category ID.
+        """
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size must be at least 1, got {chunk_size}")
+        
+        results: List[Optional[OpenAIResponse]] = [None] * len(emails)
+        cache_keys = [
+            _response_cache_key(self._build_request_body(email_content, context))
+            for email_content in emails
+        ]
+        
+        pending: List[int] = []
+        for idx, cache_key in enumerate(cache_keys):
+            cached_content = _get_cached_response(cache_key)
+            if cached_content is None:
+                pending.append(idx)
+            else:
+                results[idx] = self._drop_unknown_ids(self._parse_response_content(cached_content), context)
+        
+        if len(pending) < len(emails):
+            logger.info(f"Using cached OpenAI responses for {len(emails) - len(pending)} emails")
+        
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start:start + chunk_size]
+            try:
+                chunk_results = self._parse_email_chunk([emails[idx] for idx in chunk], context)
+            except _OPENAI_CONFIG_ERRORS:
+                raise
+            except Exception as e:
+                logger.error(f"Error parsing emails {chunk} with OpenAI: {e}")
+                continue
+            
+            for position, parsed in chunk_results.items():
+                idx = chunk[position]
+                _cache_response(cache_keys[idx], parsed.model_dump_json())
+                results[idx] = self._drop_unknown_ids(parsed, context)
+        
+        return results
+    
+    def submit_batch(self, emails: Dict[str, EmailContent],
+                     context: Optional[EmailParseContext] = None) -> str:
+        """Submit emails keyed by custom ID as an OpenAI batch job and return its ID.
+        
+        When a context is given, the model also resolves the Splitwise category ID.
+        """
+        if not emails:
+            raise ValueError("At least one email is required to submit a batch")
+        
+        buffer = io.BytesIO()
+        for custom_id, email_content in emails.items():
+            line = {
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": self._build_request_body(email_content, context)
+            }
+            buffer.write(json.dumps(line).encode("utf-8"))
+            buffer.write(b"\n")
+        buffer.seek(0)
+        
+        batch_file = self.client.files.create(
+            file=("expense_batch.jsonl", buffer),
+            purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=BATCH_COMPLETION_WINDOW
+        )
+        
+        logger.info(f"Submitted OpenAI batch {batch.id} with {len(emails)} emails")
+        return batch.id
+    
+    def wait_for_batch(self, batch_id: str, poll_interval: float = 5.0,
+                       max_poll_interval: float = 300.0,
+                       timeout: Optional[float] = None):
+        """Poll a batch job with exponential backoff until it reaches a terminal status."""
+        if poll_interval <= 0:
+            raise ValueError(f"poll_interval must be positive, got {poll_interval}")
+        
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        delay = poll_interval
+        
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status in _BATCH_TERMINAL_STATUSES:
+                logger.info(f"OpenAI batch {batch_id} finished with status: {batch.status}")
+                return batch
+            
+            if deadline is not None and time.monotonic() + delay > deadline:
+                raise TimeoutError(f"OpenAI batch {batch_id} did not finish in time (status: {batch.status})")
+            
+            logger.info(f"OpenAI batch {batch_id} status: {batch.status}, checking again in {delay:.0f}s")
+            time.sleep(delay)
+            delay = min(delay * 2, max_poll_interval)
+    
+    def collect_batch_results(self, batch,
+                              context: Optional[EmailParseContext] = None) -> Dict[str, OpenAIResponse]:
+        """Download a finished batch's output and map custom IDs to parsed responses.
+        
+        An expired or cancelled batch still yields the requests that finished
+        before it stopped. Raises ValueError if the batch failed, or stopped
+        without any output. Category IDs missing from the given context are cleared.
+        """
+        if batch.status == "failed" or (batch.status != "completed" and not batch.output_file_id):
+            raise ValueError(f"OpenAI batch {batch.id} did not complete (status: {batch.status})")
+        
+        results: Dict[str, OpenAIResponse] = {}
+        if not batch.output_file_id:
+            return results
+        
+        if batch.status != "completed":
+            logger.warning(f"OpenAI batch {batch.id} stopped early (status: {batch.status}), "
+                           f"collecting the requests that finished")
+        
+        output = self.client.files.content(batch.output_file_id).text
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            
+            record = json.loads(line)
+            custom_id = record.get("custom_id")
+            response = record.get("response") or {}
+            
+            if record.get("error") or response.get("status_code") != 200:
+                logger.error(f"Batch request {custom_id} failed: {record.get('error') or response.get('body')}")
+                continue
+            
+            try:
+                content = response["body"]["choices"][0]["message"]["content"].strip()
+                results[custom_id] = self._drop_unknown_ids(self._parse_response_content(content), context)
+            except Exception as e:
+                logger.error(f"Error parsing batch result {custom_id}: {e}")
+        
+        return results
+    
+    def parse_emails_batch(self, emails: List[EmailContent], poll_interval: float = 5.0,
+                           max_poll_interval: float = 300.0,
+                           timeout: Optional[float] = None,
+                           context: Optional[EmailParseContext] = None) -> List[Optional[OpenAIResponse]]:
+        """Parse many emails through the OpenAI Batch API.
+        
+        Results are returned in input order; entries that failed are None.
+        """
+        batch_id = self.submit_batch({str(idx): email for idx, email in enumerate(emails)}, context)
+        batch = self.wait_for_batch(batch_id, poll_interval, max_poll_interval, timeout)
+        results = self.collect_batch_results(batch, context)
+        return [results.get(str(idx)) for idx in range(len(emails))]
+    
     def validate_parsing_confidence(self, response: OpenAIResponse, 
                                   min_confidence: float = 0.5) -> bool:
         """Validate that the parsing confidence meets minimum threshold."""
@@ -1,11 +1,24 @@
 """Expense converter for transforming parsed email data to Splitwise expenses."""
 
 import logging
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Optional
+import requests
 from models import ParsedExpense, SplitwiseExpense, SplitwiseUser
 from splitwise_client import SplitwiseClient
 
 logger = logging.getLogger(__name__)
 
+CENTS = Decimal("0.01")
+
+def format_amount(amount: float) -> str:
+    """Format an amount as a 2-decimal string, rounding half up in decimal.
+    
+    Going through the shortest repr avoids binary float artifacts such as
+    2.675 formatting as "2.67".
+    """
+    return str(Decimal(repr(amount)).quantize(CENTS, rounding=ROUND_HALF_UP))
+
 class ExpenseConverter:
     """Converts parsed expense data to Splitwise expense format."""
     
@@ -25,21 +38,43 @@ class ExpenseConverter:
             logger.error(f"Failed to load current user: {e}")
             raise
     
-    def convert_to_splitwise_expense(self, parsed_expense: ParsedExpense, group_id: int, email_summary: str = None) -> SplitwiseExpense:
-        """Convert parsed expense to Splitwise expense object."""
+    def _find_category_id(self, category_name: str) -> Optional[int]:
+        """Look up a category ID by name, or None if categories cannot be loaded."""
+        try:
+            return self.splitwise_client.find_category_by_name(category_name)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.warning(f"Could not look up Splitwise category {category_name!r}: {e}")
+            return None
+    
+    def convert_to_splitwise_expense(self, parsed_expense: ParsedExpense, group_id: int,
+                                     email_summary: Optional[str] = None) -> SplitwiseExpense:
+        """Convert parsed expense to Splitwise expense object.
+        
+        The email summary, when given, is attached as the expense details.
+        """
         
         # Format date if available
         date_str = None
         if parsed_expense.date:
             date_str = parsed_expense.date.strftime("%Y-%m-%dT%H:%M:%SZ") if hasattr(parsed_expense.date, 'strftime') else str(parsed_expense.date)
         
+        # Fall back to the local category index when OpenAI was not given the
+        # Splitwise directory (or picked no category from it)
+        category_id = parsed_expense.category_id
+        if category_id is None and parsed_expense.category:
+            category_id = self._find_category_id(parsed_expense.category)
+        
         # For equal splits, don't include users - authenticated user is assumed to be payer
-        # and expense is split equally among all group members
-        splitwise_expense = SplitwiseExpense(
-            cost=f"{parsed_expense.amount:.2f}",
+        # and expense is split equally among all group members.
+        # model_construct skips validation: every field is either a literal, a string
+        # formatted here, or taken from the already-validated ParsedExpense. Untrusted
+        # data is validated at the boundary where OpenAIResponse is built.
+        splitwise_expense = SplitwiseExpense.model_construct(
+            cost=format_amount(parsed_expense.amount),
             description=parsed_expense.description,
             currency_code=parsed_expense.currency,
             date=date_str,
+            category_id=category_id,
             details=email_summary,  # Add email summary as details/notes
             group_id=group_id,
             users=None,  # Don't include users for equal split
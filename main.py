@@ -1,28 +1,49 @@
 """Main module for expense forwarder application."""
 
+from __future__ import annotations
+
+import asyncio
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
 import argparse
-from typing import Optional
+import weakref
+from typing import List, Optional, Tuple
+
+import requests
 
+from batch_ledger import create_batch_ledger
 from config import config
-from models import EmailContent
-from email_parser import create_email_parser
-from splitwise_client import create_splitwise_client
-from expense_converter import create_expense_converter
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('expense_forwarder.log')
-    ]
-)
+from models import EmailContent, EmailParseContext
+from splitwise_client import create_splitwise_client, create_async_splitwise_client
+from token_store import TokenStore, create_token_store
+
+# Log file rotation settings for the CLI
+LOG_FILE = 'expense_forwarder.log'
+LOG_MAX_BYTES = 5_000_000
+LOG_BACKUP_COUNT = 3
 
 logger = logging.getLogger(__name__)
 
+def _batch_custom_id(index: int, group_id: int) -> str:
+    """Encode an email's position and target group into a batch custom ID."""
+    return f"email-{index}-group-{group_id}"
+
+def _parse_batch_custom_id(custom_id: str) -> Tuple[int, int]:
+    """Decode the position and group ID from a batch custom ID.
+    
+    Raises ValueError if the ID was not produced by _batch_custom_id.
+    """
+    try:
+        prefix, index, group_label, group_id = custom_id.split('-')
+        if prefix != 'email' or group_label != 'group':
+            raise ValueError
+        return int(index), int(group_id)
+    except ValueError:
+        raise ValueError(f"Unrecognized batch custom ID: {custom_id!r}") from None
+
 class ExpenseForwarder:
     """Main application class for forwarding email expenses to Splitwise."""
     
@@ -33,13 +54,34 @@ class ExpenseForwarder:
         if not config.validate():
             raise ValueError("Configuration validation failed. Please check your environment variables.")
         
-        # Initialize components
-        self.email_parser = create_email_parser()
-        self.splitwise_client = create_splitwise_client(access_token)
+        # Reuse stored tokens when no access token is given, so warm runs skip
+        # the interactive OAuth flow
+        self.token_store = create_token_store()
+        refresh_token = None
+        expires_at = None
+        if not access_token:
+            stored_tokens = self.token_store.load()
+            if stored_tokens and (stored_tokens.get('refresh_token') or
+                                  not TokenStore.is_expired(stored_tokens)):
+                access_token = stored_tokens['access_token']
+                refresh_token = stored_tokens.get('refresh_token')
+                expires_at = stored_tokens.get('expires_at')
+                logger.info("Loaded stored Splitwise tokens")
+        
+        # Initialize components; the email parser (and the OpenAI SDK) is only
+        # loaded when an email is first parsed
+        self._email_parser = None
+        self.splitwise_client = create_splitwise_client(
+            access_token,
+            refresh_token=refresh_token,
+            expires_at=expires_at,
+            token_store=self.token_store
+        )
         
         # Initialize converter if access token is provided
         if access_token:
             try:
+                from expense_converter import create_expense_converter
                 self.expense_converter = create_expense_converter(self.splitwise_client)
                 logger.info("Initialized expense converter with provided access token")
             except Exception as e:
@@ -47,7 +89,28 @@ class ExpenseForwarder:
                 self.expense_converter = None
         else:
             self.expense_converter = None
+        
+        # Expenses already created per batch, so re-collecting a batch skips them
+        self.batch_ledger = create_batch_ledger()
+        
+        # Async Splitwise client, created per event loop on first async use; the
+        # loop is held weakly so a finished loop can be garbage collected
+        self._async_splitwise_client = None
+        self._async_splitwise_client_loop = None
     
+    @property
+    def email_parser(self):
+        """Email parser, created on first use."""
+        if self._email_parser is None:
+            from email_parser import create_email_parser
+            self._email_parser = create_email_parser()
+        return self._email_parser
+
+    @email_parser.setter
+    def email_parser(self, email_parser):
+        """Replace the email parser."""
+        self._email_parser = email_parser
+
     def authenticate_splitwise(self) -> str:
         """Authenticate with Splitwise and return access token."""
         logger.info("Starting Splitwise OAuth authentication...")
@@ -57,6 +120,7 @@ class ExpenseForwarder:
             logger.info("Successfully authenticated with Splitwise")
             
             # Initialize the expense converter now that we have authentication
+            from expense_converter import create_expense_converter
             self.expense_converter = create_expense_converter(self.splitwise_client)
             
             return access_token
@@ -65,6 +129,44 @@ class ExpenseForwarder:
             logger.error(f"Authentication failed: {e}")
             raise
     
+    async def authenticate_splitwise_async(self) -> str:
+        """Authenticate with Splitwise without blocking the event loop."""
+        logger.info("Starting Splitwise OAuth authentication...")
+        
+        try:
+            access_token = await self.splitwise_client.authorize_interactive_async()
+            logger.info("Successfully authenticated with Splitwise")
+        
+            # The converter loads the current user over the sync client
+            from expense_converter import create_expense_converter
+            self.expense_converter = await asyncio.to_thread(create_expense_converter, self.splitwise_client)
+        
+            return access_token
+        
+        except Exception as e:
+            logger.error(f"Authentication failed: {e}")
+            raise
+    
+    def _build_parse_context(self) -> Optional[EmailParseContext]:
+        """Build the Splitwise directory OpenAI uses to resolve category IDs.
+        
+        Uses the client's cached categories. Returns None if they cannot be fetched,
+        in which case emails are parsed without ID resolution.
+        """
+        try:
+            # Expenses are filed under subcategories, so only those are listed
+            categories = [
+                {'id': subcategory.get('id'), 'name': f"{category.get('name')} - {subcategory.get('name')}"}
+                for category in self.splitwise_client.get_categories_cached()
+                for subcategory in category.get('subcategories', [])
+            ]
+        except (requests.exceptions.RequestException, ValueError) as e:
+            # Includes malformed response bodies; the directory is optional
+            logger.warning(f"Could not load Splitwise directory for parsing: {e}")
+            return None
+        
+        return EmailParseContext(categories=categories)
+    
     def process_email(self, subject: str, body: str, group_id: int) -> dict:
         """Process email content and create Splitwise expense."""
         
@@ -79,7 +181,8 @@ class ExpenseForwarder:
             
             # Parse email using OpenAI
             logger.info("Parsing email with OpenAI...")
-            openai_response = self.email_parser.parse_email(email_content)
+            context = self._build_parse_context()
+            openai_response = self.email_parser.parse_email(email_content, context)
             
             logger.info(f"OpenAI parsing confidence: {openai_response.confidence:.2f}")
             
@@ -95,29 +198,224 @@ class ExpenseForwarder:
             logger.info("Creating expense in Splitwise...")
             response = self.splitwise_client.create_expense(splitwise_expense)
             
-            # Get the first (and typically only) expense from the response
-            expense = response.expenses[0] if response.expenses else {}
-            expense_id = expense.get('id')
+            return self._build_success_result(splitwise_expense, openai_response, response)
+            
+        except Exception as e:
+            logger.error(f"Error processing email: {e}")
+            return self._build_failure_result(subject, e)
+    
+    def _async_splitwise_client_bound_loop(self):
+        """Return the loop the async Splitwise client was created on, if it still exists."""
+        if self._async_splitwise_client_loop is None:
+            return None
+        return self._async_splitwise_client_loop()
+    
+    def _get_async_splitwise_client(self):
+        """Return the async Splitwise client for the running event loop.
+        
+        Await aclose() before the loop finishes to release its connections.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._async_splitwise_client
+        bound_loop = self._async_splitwise_client_bound_loop()
+        
+        if client is not None and bound_loop is not loop:
+            # Pooled connections belong to the old loop, so close them there if it still runs
+            if bound_loop is not None and bound_loop.is_running():
+                asyncio.run_coroutine_threadsafe(client.aclose(), bound_loop)
+            else:
+                logger.warning("Discarding async Splitwise client from a finished event loop without closing it")
+            client = None
+        
+        if client is None:
+            client = create_async_splitwise_client(self.splitwise_client.access_token, self.splitwise_client)
+            self._async_splitwise_client = client
+            self._async_splitwise_client_loop = weakref.ref(loop)
+        elif client.access_token != self.splitwise_client.access_token:
+            client.set_access_token(self.splitwise_client.access_token)
+        
+        return client
+    
+    async def aclose(self):
+        """Close async clients bound to the running event loop."""
+        client = self._async_splitwise_client
+        if client is not None and self._async_splitwise_client_bound_loop() is asyncio.get_running_loop():
+            self._async_splitwise_client = None
+            self._async_splitwise_client_loop = None
+            await client.aclose()
+        
+        if self._email_parser is not None:
+            await self._email_parser.aclose()
+    
+    async def process_email_async(self, subject: str, body: str, group_id: int) -> dict:
+        """Process email content and create Splitwise expense without blocking the event loop.
+        
+        Many emails can be processed concurrently, e.g. with asyncio.gather.
+        """
+        
+        if not self.expense_converter:
+            raise ValueError("Not authenticated with Splitwise. Please authenticate first.")
+        
+        logger.info(f"Processing email: {subject[:50]}...")
+        
+        try:
+            # Create email content model
+            email_content = EmailContent(subject=subject, body=body)
+            
+            # Parse email using OpenAI
+            logger.info("Parsing email with OpenAI...")
+            context = await asyncio.to_thread(self._build_parse_context)
+            openai_response = await self.email_parser.parse_email_async(email_content, context)
+            
+            logger.info(f"OpenAI parsing confidence: {openai_response.confidence:.2f}")
+            
+            # Convert to Splitwise expense
+            logger.info("Converting to Splitwise expense...")
+            splitwise_expense = self.expense_converter.convert_to_splitwise_expense(
+                openai_response.parsed_expense,
+                group_id,
+                openai_response.email_summary
+            )
             
-            logger.info(f"Successfully created expense: {expense_id}")
+            # Create expense in Splitwise
+            logger.info("Creating expense in Splitwise...")
+            response = await self._get_async_splitwise_client().create_expense(splitwise_expense)
             
-            return {
-                'success': True,
-                'expense_id': expense_id,
-                'description': splitwise_expense.description,
-                'amount': splitwise_expense.cost,
-                'currency': splitwise_expense.currency_code,
-                'confidence': openai_response.confidence,
-                'notes': openai_response.notes
-            }
+            return self._build_success_result(splitwise_expense, openai_response, response)
             
         except Exception as e:
             logger.error(f"Error processing email: {e}")
-            return {
-                'success': False,
-                'error': str(e),
-                'description': subject[:100] if subject else 'Unknown'
-            }
+            return self._build_failure_result(subject, e)
+    
+    @staticmethod
+    def _build_success_result(splitwise_expense, openai_response, response) -> dict:
+        """Build the result dict for a successfully created expense."""
+        # Get the first (and typically only) expense from the response
+        expense = response.expenses[0] if response.expenses else {}
+        expense_id = expense.get('id')
+        
+        logger.info(f"Successfully created expense: {expense_id}")
+        
+        return {
+            'success': True,
+            'expense_id': expense_id,
+            'description': splitwise_expense.description,
+            'amount': splitwise_expense.cost,
+            'currency': splitwise_expense.currency_code,
+            'confidence': openai_response.confidence,
+            'notes': openai_response.notes
+        }
+    
+    @staticmethod
+    def _build_failure_result(subject: str, error: Exception) -> dict:
+        """Build the result dict for an email that could not be processed."""
+        return {
+            'success': False,
+            'error': str(error),
+            'description': subject[:100] if subject else 'Unknown'
+        }
+    
+    def submit_batch(self, emails: List[Tuple[str, str, int]]) -> str:
+        """Submit (subject, body, group_id) emails for parsing via the OpenAI Batch API.
+        
+        Returns the batch ID to pass to collect_batch once the job has finished
+        (within 24 hours). The target group of each email travels in its custom ID.
+        Raises ValueError, before uploading anything, if a group ID is not a positive integer.
+        """
+        for index, (_, _, group_id) in enumerate(emails):
+            if isinstance(group_id, bool) or not isinstance(group_id, int) or group_id <= 0:
+                raise ValueError(f"Email {index} needs a positive integer group ID, got {group_id!r}")
+        
+        batch_emails = {
+            _batch_custom_id(index, group_id): EmailContent(subject=subject, body=body)
+            for index, (subject, body, group_id) in enumerate(emails)
+        }
+        
+        batch_id = self.email_parser.submit_batch(batch_emails, self._build_parse_context())
+        logger.info(f"Submitted {len(batch_emails)} emails as OpenAI batch {batch_id}")
+        return batch_id
+    
+    def collect_batch(self, batch_id: str, poll_interval: float = 5.0,
+                      max_poll_interval: float = 300.0,
+                      timeout: Optional[float] = None) -> List[dict]:
+        """Wait for a submitted batch and create a Splitwise expense for each parsed email.
+        
+        Returns one result dict per submitted email, in submission order. Raises
+        ValueError, before creating any expense, if a result has an unrecognized custom ID.
+        
+        Created expenses are recorded in the batch ledger, so collecting the same
+        batch again (e.g. after a partial failure) returns the recorded results
+        instead of creating those expenses twice. Once every expense has been
+        created the batch is forgotten, and collecting it again raises ValueError.
+        """
+        
+        if not self.expense_converter:
+            raise ValueError("Not authenticated with Splitwise. Please authenticate first.")
+        
+        if self.batch_ledger.is_completed(batch_id):
+            raise ValueError(f"OpenAI batch {batch_id} was already collected")
+        
+        batch = self.email_parser.wait_for_batch(batch_id, poll_interval, max_poll_interval, timeout)
+        parsed_results = self.email_parser.collect_batch_results(batch, self._build_parse_context())
+        
+        # Decode every ID up front so a malformed one aborts before any expense is created
+        decoded_ids = {custom_id: _parse_batch_custom_id(custom_id) for custom_id in parsed_results}
+        created = self.batch_ledger.load(batch_id)
+        
+        results_by_index = {}
+        for custom_id, openai_response in parsed_results.items():
+            index, group_id = decoded_ids[custom_id]
+            
+            if custom_id in created:
+                logger.info(f"Skipping batch email {custom_id}, its expense was already created")
+                results_by_index[index] = created[custom_id]
+                continue
+            
+            try:
+                logger.info(f"OpenAI parsing confidence for {custom_id}: {openai_response.confidence:.2f}")
+                splitwise_expense = self.expense_converter.convert_to_splitwise_expense(
+                    openai_response.parsed_expense,
+                    group_id,
+                    openai_response.email_summary
+                )
+                response = self.splitwise_client.create_expense(splitwise_expense)
+                results_by_index[index] = self._build_success_result(splitwise_expense, openai_response, response)
+                
+            except Exception as e:
+                logger.error(f"Error processing batch email {custom_id}: {e}")
+                results_by_index[index] = self._build_failure_result(openai_response.parsed_expense.description, e)
+                continue
+            
+            try:
+                self.batch_ledger.record(batch_id, custom_id, results_by_index[index])
+            except OSError as e:
+                logger.error(f"Could not record batch email {custom_id} as created: {e}")
+        
+        missing_error = ValueError("OpenAI batch request failed or returned an invalid response")
+        results = [
+            results_by_index.get(index) or self._build_failure_result(None, missing_error)
+            for index in range(batch.request_counts.total)
+        ]
+        
+        # Nothing is left to retry, so the per-expense records are no longer needed
+        if all(result['success'] for result in results):
+            try:
+                self.batch_ledger.forget(batch_id)
+            except OSError as e:
+                logger.error(f"Could not mark OpenAI batch {batch_id} as collected: {e}")
+        
+        return results
+    
+    async def info_bundle(self) -> Tuple[dict, list, list, list]:
+        """Get user info, friends, groups and categories with concurrent requests."""
+        if not self.splitwise_client.access_token:
+            raise ValueError("Not authenticated with Splitwise")
+        
+        try:
+            return await self._get_async_splitwise_client().info_bundle()
+        except Exception as e:
+            logger.error(f"Error getting Splitwise info: {e}")
+            raise
     
     def get_user_info(self) -> dict:
         """Get current user information."""
@@ -152,8 +450,65 @@ class ExpenseForwarder:
             logger.error(f"Error listing groups: {e}")
             raise
 
+def _configure_logging():
+    """Configure console and rotating file logging for the CLI.
+    
+    Console records are written directly, so they stay in order with the
+    results main() prints to stdout. File records are handed to a queue and
+    written by a background listener thread, so logging calls never wait on
+    disk I/O. Library users of ExpenseForwarder keep their own logging
+    configuration.
+    """
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    stream_handler = logging.StreamHandler(sys.stdout)
+    file_handler = logging.handlers.RotatingFileHandler(
+        LOG_FILE,
+        maxBytes=LOG_MAX_BYTES,
+        backupCount=LOG_BACKUP_COUNT
+    )
+    for handler in (stream_handler, file_handler):
+        handler.setFormatter(formatter)
+    
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, file_handler)
+    listener.start()
+    
+    # Flush queued records before the process exits
+    atexit.register(listener.stop)
+    
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(stream_handler)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+async def _fetch_info_bundle(forwarder: ExpenseForwarder) -> Tuple[dict, list, list, list]:
+    """Fetch the info bundle, closing the async clients before the loop ends."""
+    try:
+        return await forwarder.info_bundle()
+    finally:
+        await forwarder.aclose()
+
+def _print_user_info(user_info: dict):
+    """Print the current user's name and email."""
+    print(f"\nUser: {user_info['user']['first_name']} {user_info['user']['last_name']}")
+    print(f"Email: {user_info['user']['email']}")
+
+def _print_friends(friends: list):
+    """Print friends with their emails."""
+    print(f"\nFriends ({len(friends)}):")
+    for friend in friends:
+        print(f"  - {friend['first_name']} {friend['last_name']} ({friend['email']})")
+
+def _print_groups(groups: list):
+    """Print groups with their IDs."""
+    print(f"\nGroups ({len(groups)}):")
+    for group in groups:
+        print(f"  - {group['name']} (ID: {group['id']})")
+
 def main():
     """Main entry point for command line usage."""
+    _configure_logging()
+    
     parser = argparse.ArgumentParser(description='Forward email expenses to Splitwise')
     parser.add_argument('--subject', help='Email subject')
     parser.add_argument('--body', help='Email body')
@@ -182,8 +537,8 @@ def main():
         # Initialize forwarder
         forwarder = ExpenseForwarder(access_token=args.access_token)
         
-        # Authenticate if no token provided
-        if not args.access_token:
+        # Authenticate if no token was provided or stored, or the token was rejected
+        if args.auth_only or forwarder.expense_converter is None:
             access_token = forwarder.authenticate_splitwise()
             print(f"\nAccess token: {access_token}")
             
@@ -191,25 +546,28 @@ def main():
                 print("Authentication completed successfully!")
                 return
         
-        # Handle info commands
+        # Handle info commands; several at once are fetched concurrently
+        requested_info = [args.user_info, args.list_friends, args.list_groups]
+        if sum(requested_info) > 1:
+            user_info, friends, groups, _ = asyncio.run(_fetch_info_bundle(forwarder))
+            if args.user_info:
+                _print_user_info(user_info)
+            if args.list_friends:
+                _print_friends(friends)
+            if args.list_groups:
+                _print_groups(groups)
+            return
+        
         if args.user_info:
-            user_info = forwarder.get_user_info()
-            print(f"\nUser: {user_info['user']['first_name']} {user_info['user']['last_name']}")
-            print(f"Email: {user_info['user']['email']}")
+            _print_user_info(forwarder.get_user_info())
             return
         
         if args.list_friends:
-            friends = forwarder.list_friends()
-            print(f"\nFriends ({len(friends)}):")
-            for friend in friends:
-                print(f"  - {friend['first_name']} {friend['last_name']} ({friend['email']})")
+            _print_friends(forwarder.list_friends())
             return
         
         if args.list_groups:
-            groups = forwarder.list_groups()
-            print(f"\nGroups ({len(groups)}):")
-            for group in groups:
-                print(f"  - {group['name']} (ID: {group['id']})")
+            _print_groups(forwarder.list_groups())
             return
         
         # Process email
@@ -1,14 +1,21 @@
 """Data models for expense forwarder."""
 
+import re
 from datetime import datetime
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field, validator
-from decimal import Decimal
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+# Validation constants built once at import rather than per validator call
+_SPLIT_TYPES = ('equal', 'exact', 'percentage')
+_VALID_SPLIT_TYPES = frozenset(_SPLIT_TYPES)
+_CURRENCY_RE = re.compile(r'[A-Za-z]{3}')
 
 class ParsedExpense(BaseModel):
     """Parsed expense data from email content."""
     
-    description: str = Field(..., description="Description of the expense")
+    # Not deferred: OpenAIResponse embeds this model and is built at import, and
+    # it reuses this model's schema instead of generating it a second time
+    description: str = Field(..., min_length=1, description="Description of the expense")
     amount: float = Field(..., gt=0, description="Amount of the expense")
     currency: str = Field(default="USD", description="Currency code")
     date: Optional[datetime] = Field(default=None, description="Date of the expense")
@@ -16,33 +23,43 @@ class ParsedExpense(BaseModel):
     participants: List[str] = Field(default_factory=list, description="List of participant names or emails")
     split_type: str = Field(default="equal", description="How to split the expense (equal, exact, percentage)")
     paid_by: Optional[str] = Field(default=None, description="Who paid for the expense")
+    category_id: Optional[int] = Field(default=None, description="Splitwise category ID, if resolved")
     
-    @validator('currency')
+    @field_validator('currency')
+    @classmethod
     def validate_currency(cls, v):
         """Validate currency code."""
-        if len(v) != 3:
-            raise ValueError('Currency code must be 3 characters')
-        return v.upper()
+        if not _CURRENCY_RE.fullmatch(v):
+            raise ValueError('Currency code must be 3 letters')
+        return v if v.isupper() else v.upper()
     
-    @validator('split_type')
+    @field_validator('split_type')
+    @classmethod
     def validate_split_type(cls, v):
         """Validate split type."""
-        valid_types = ['equal', 'exact', 'percentage']
-        if v not in valid_types:
-            raise ValueError(f'Split type must be one of {valid_types}')
+        if v not in _VALID_SPLIT_TYPES:
+            raise ValueError(f'Split type must be one of {list(_SPLIT_TYPES)}')
         return v
 
 class SplitwiseUser(BaseModel):
-    """Splitwise user data for expense creation."""
+    """Splitwise user data for expense creation.
+    
+    Fields match the create_expense request shape exactly, so the model can be
+    serialized without reshaping.
+    """
+    
+    model_config = ConfigDict(defer_build=True)
     
     user_id: int = Field(..., description="Splitwise user ID")
     paid_share: str = Field(default="0.00", description="Amount this user paid")
     owed_share: str = Field(default="0.00", description="Amount this user owes")
-    net_balance: str = Field(default="0.00", description="Net balance for this user")
 
 class SplitwiseExpense(BaseModel):
     """Splitwise expense request model."""
     
+    # None values are dropped when serializing with model_dump(exclude_none=True)
+    model_config = ConfigDict(defer_build=True)
+    
     cost: str = Field(..., description="Total cost of the expense")
     description: str = Field(..., description="Description of the expense")
     details: Optional[str] = Field(default=None, description="Additional details/notes about the expense")
@@ -52,17 +69,12 @@ class SplitwiseExpense(BaseModel):
     group_id: Optional[int] = Field(default=None, description="Group ID (required for group expenses)")
     users: Optional[List[SplitwiseUser]] = Field(default=None, description="List of users involved in the expense")
     split_equally: bool = Field(default=True, description="Whether to split equally")
-    
-    class Config:
-        """Pydantic model configuration."""
-        json_encoders = {
-            Decimal: str
-        }
-        exclude_none = True  # Exclude None values from JSON
 
 class SplitwiseExpenseResponse(BaseModel):
     """Splitwise API response for expense creation."""
     
+    model_config = ConfigDict(defer_build=True)
+    
     expenses: List[Dict[str, Any]] = Field(..., description="Created expenses data")
     errors: Dict[str, Any] = Field(default_factory=dict, description="API errors")
 
@@ -73,13 +85,19 @@ class EmailContent(BaseModel):
     body: str = Field(..., description="Email body")
     sender: Optional[str] = Field(default=None, description="Email sender")
     
-    @validator('subject', 'body')
+    @field_validator('subject', 'body')
+    @classmethod
     def validate_not_empty(cls, v):
         """Validate that subject and body are not empty."""
         if not v or not v.strip():
             raise ValueError('Subject and body cannot be empty')
         return v.strip()
 
+class EmailParseContext(BaseModel):
+    """Splitwise directory given to OpenAI so it can resolve categories itself."""
+    
+    categories: List[Dict[str, Any]] = Field(default_factory=list, description="Expense categories as {id, name}")
+
 class OpenAIResponse(BaseModel):
     """OpenAI API response model."""
     
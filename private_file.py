@@ -0,0 +1,26 @@
+"""Helpers for files holding private state, readable only by the current user."""
+
+import os
+from pathlib import Path
+
+def _ensure_private_dir(path: Path):
+    """Create the file's parent directory with mode 0700 if it is missing."""
+    path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+def write_private_file(path: Path, content: str):
+    """Replace a file atomically with the given content, with mode 0600."""
+    _ensure_private_dir(path)
+
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as private_file:
+        private_file.write(content)
+    os.replace(tmp_path, path)
+
+def append_private_line(path: Path, line: str):
+    """Append one line to a file, creating it with mode 0600 if it is missing."""
+    _ensure_private_dir(path)
+
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+    with os.fdopen(fd, 'a') as private_file:
+        private_file.write(line + '\n')
@@ -7,8 +7,9 @@ from pathlib import Path
 
 def check_python_version():
     """Check if Python version is compatible."""
-    if sys.version_info < (3, 8):
-        print("❌ Python 3.8 or higher is required")
+    # asyncio.to_thread, used by the async code paths, needs Python 3.9
+    if sys.version_info < (3, 9):
+        print("❌ Python 3.9 or higher is required")
         print(f"Current version: {sys.version}")
         return False
     print(f"✅ Python version: {sys.version.split()[0]}")
@@ -59,14 +60,14 @@ def run_basic_test():
     """Run basic tests to verify setup."""
     print("\n🧪 Running basic tests...")
     try:
-        result = subprocess.run([sys.executable, "test_example.py"], 
+        result = subprocess.run([sys.executable, "-m", "pytest", "-q", "test_example.py"], 
                                capture_output=True, text=True, timeout=30)
         
         if result.returncode == 0:
             print("✅ Basic tests passed")
             return True
         else:
-            print(f"❌ Tests failed: {result.stderr}")
+            print(f"❌ Tests failed: {result.stdout}{result.stderr}")
             return False
             
     except subprocess.TimeoutExpired:
@@ -1,44 +1,180 @@
 """Splitwise API client with OAuth authentication."""
 
+import asyncio
 import logging
-import json
-import webbrowser
-from typing import Dict, Any, Optional, List
+import threading
+import time
+import weakref
+from typing import Dict, Any, Optional, List, Tuple
 from urllib.parse import urlencode, parse_qs, urlparse
+import httpx
 import requests
-from requests_oauthlib import OAuth2Session
+from pydantic_core import from_json, to_json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from config import config
 from models import SplitwiseExpense, SplitwiseExpenseResponse
+from token_store import TokenStore
 
 logger = logging.getLogger(__name__)
 
+# Connection pool and retry settings for the Splitwise session. urllib3 does
+# not retry POST by default, so expense creation is never sent twice.
+HTTP_POOL_SIZE = 10
+HTTP_RETRY = Retry(
+    total=3,
+    backoff_factor=0.3,
+    status_forcelist=[429, 500, 502, 503, 504],
+    raise_on_status=False  # Let raise_for_status() report the final response
+)
+
+# (connect, read) timeouts for the Splitwise session, so a hung endpoint cannot
+# stall the caller indefinitely
+HTTP_TIMEOUT = (5, 30)
+
+# Error response bodies are truncated to this many characters when logged
+ERROR_BODY_LOG_LIMIT = 1024
+
+# Connection settings for the async client
+ASYNC_HTTP_MAX_CONNECTIONS = 20
+ASYNC_HTTP_KEEPALIVE_EXPIRY = 60.0
+ASYNC_HTTP_TIMEOUT = 30.0
+
+# Request bodies are pre-serialized with pydantic_core, so their content type
+# is set per request
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+AUTH_CALLBACK_PROMPT = "\nPaste the full callback URL here: "
+
+def _redact_tokens(token_response: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a copy of an OAuth token response that is safe to log."""
+    return {
+        key: '<redacted>' if key in ('access_token', 'refresh_token') else value
+        for key, value in token_response.items()
+    }
+
+def _error_body(response) -> str:
+    """Return an error response body for logging, truncated to ERROR_BODY_LOG_LIMIT."""
+    if response is None:
+        return 'No response'
+    return response.text[:ERROR_BODY_LOG_LIMIT]
+
+def _decode_json(response) -> Dict[str, Any]:
+    """Decode a successful response body, logging it truncated if it is not JSON."""
+    try:
+        return from_json(response.content)
+    except ValueError as e:
+        logger.error(f"Invalid JSON response: {e}")
+        logger.error(f"Response content: {_error_body(response)}")
+        raise
+
+def _build_expense_payload(expense: SplitwiseExpense) -> Dict[str, Any]:
+    """Convert an expense model to the request body expected by the Splitwise API."""
+    # SplitwiseUser already has the request shape, so users need no reshaping
+    expense_data = expense.model_dump(exclude_none=True)
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Creating expense with data: %s", to_json(expense_data).decode())
+    return expense_data
+
+def _parse_expense_response(response: Dict[str, Any]) -> SplitwiseExpenseResponse:
+    """Validate a create_expense response, raising on API-reported errors."""
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Splitwise response: %s", to_json(response).decode())
+    
+    # Check if response contains errors
+    if 'errors' in response and response['errors']:
+        raise ValueError(f"Splitwise API error: {response['errors']}")
+    
+    return SplitwiseExpenseResponse(**response)
+
+def _print_authorization_prompt(auth_url: str):
+    """Print the authorization URL for the interactive OAuth flow."""
+    print(f"\nPlease visit this URL to authorize the application:")
+    print(f"{auth_url}")
+    print("\nOpening browser...")
+
 class SplitwiseClient:
     """Client for interacting with Splitwise API using OAuth2."""
     
-    def __init__(self, access_token: Optional[str] = None):
-        """Initialize Splitwise client."""
-        if not config.SPLITWISE_CLIENT_ID or not config.SPLITWISE_CLIENT_SECRET:
+    def __init__(self, access_token: Optional[str] = None, refresh_token: Optional[str] = None,
+                 expires_at: Optional[float] = None, token_store: Optional[TokenStore] = None):
+        """Initialize Splitwise client.
+        
+        When a token store is given, tokens obtained by authorization or refresh
+        are saved to it.
+        """
+        client_id = config.SPLITWISE_CLIENT_ID
+        client_secret = config.SPLITWISE_CLIENT_SECRET
+        if not client_id or not client_secret:
             raise ValueError("Splitwise client ID and secret are required")
         
-        self.client_id = config.SPLITWISE_CLIENT_ID
-        self.client_secret = config.SPLITWISE_CLIENT_SECRET
+        self.client_id = client_id
+        self.client_secret = client_secret
         self.redirect_uri = config.SPLITWISE_REDIRECT_URI
         self.base_url = config.SPLITWISE_BASE_URL
         self.auth_url = config.SPLITWISE_AUTH_URL
         self.token_url = config.SPLITWISE_TOKEN_URL
+        self.lookup_cache_ttl = config.SPLITWISE_LOOKUP_CACHE_TTL
         
         self.access_token = access_token
+        self.refresh_token = refresh_token
+        self.expires_at = expires_at
+        self.token_store = token_store
+        # Serializes refreshes so concurrent callers hitting an expired token share one
+        self._refresh_lock = threading.Lock()
         self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(
+            pool_connections=HTTP_POOL_SIZE,
+            pool_maxsize=HTTP_POOL_SIZE,
+            max_retries=HTTP_RETRY
+        ))
+        # Session-wide headers only; Content-Type is set per request on POST bodies
+        self.session.headers.update({
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip'
+        })
+        
+        # Current user for the active access token, fetched on first use
+        self._current_user: Optional[Dict[str, Any]] = None
+        
+        # Friends and categories cached for local lookups, each refreshed after
+        # SPLITWISE_LOOKUP_CACHE_TTL seconds. The locks let concurrent callers share
+        # one refetch instead of each hitting the API on a cold cache.
+        self._friends_cache_lock = threading.Lock()
+        self._categories_cache_lock = threading.Lock()
+        self._friends_cache: Optional[List[Dict[str, Any]]] = None
+        self._friends_cache_time = 0.0
+        self._friends_by_email: Dict[str, Dict[str, Any]] = {}
+        self._friends_by_name: Dict[str, Dict[str, Any]] = {}
+        self._categories_cache: Optional[List[Dict[str, Any]]] = None
+        self._categories_cache_time = 0.0
+        self._category_index: Dict[str, int] = {}
+        
+        # Release pooled connections when the client is collected or the process exits
+        self._finalizer = weakref.finalize(self, self.session.close)
         
         if self.access_token:
-            self.session.headers.update({
-                'Authorization': f'Bearer {self.access_token}',
-                'Content-Type': 'application/json'
-            })
+            self.session.headers['Authorization'] = f'Bearer {self.access_token}'
+    
+    def close(self):
+        """Close the HTTP session and its pooled connections."""
+        self._finalizer()
+    
+    def __enter__(self):
+        """Enter a context that closes the client on exit."""
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Close the client when leaving the context."""
+        self.close()
     
     def get_authorization_url(self) -> str:
         """Get the authorization URL for OAuth flow."""
+        # Only needed for interactive authorization, so not imported at startup
+        from requests_oauthlib import OAuth2Session
+        
         oauth = OAuth2Session(
             client_id=self.client_id,
             redirect_uri=self.redirect_uri,
@@ -50,30 +186,103 @@ class SplitwiseClient:
         return authorization_url
     
     def authorize_interactive(self) -> str:
-        """Interactive OAuth authorization flow."""
-        auth_url = self.get_authorization_url()
+        """Interactive OAuth authorization flow.
         
-        print(f"\nPlease visit this URL to authorize the application:")
-        print(f"{auth_url}")
-        print("\nOpening browser...")
+        This blocks on the browser and stdin, so it must not be called from
+        inside a running event loop; use authorize_interactive_async there.
+        """
+        auth_url = self.get_authorization_url()
+        _print_authorization_prompt(auth_url)
         
+        import webbrowser
         try:
             webbrowser.open(auth_url)
         except Exception as e:
             logger.warning(f"Could not open browser: {e}")
         
         # Get authorization code from user
-        callback_url = input("\nPaste the full callback URL here: ").strip()
+        callback_url = input(AUTH_CALLBACK_PROMPT).strip()
         
-        # Extract authorization code
+        auth_code = self._extract_auth_code(callback_url)
+        return self.exchange_code_for_token(auth_code)
+    
+    async def authorize_interactive_async(self) -> str:
+        """Interactive OAuth authorization flow for async callers.
+        
+        The browser, stdin prompt and token exchange run in worker threads so
+        other tasks on the event loop keep running while waiting for the user.
+        """
+        auth_url = self.get_authorization_url()
+        _print_authorization_prompt(auth_url)
+        
+        import webbrowser
+        try:
+            await asyncio.to_thread(webbrowser.open, auth_url)
+        except Exception as e:
+            logger.warning(f"Could not open browser: {e}")
+        
+        # Get authorization code from user
+        callback_url = (await asyncio.to_thread(input, AUTH_CALLBACK_PROMPT)).strip()
+        
+        auth_code = self._extract_auth_code(callback_url)
+        return await asyncio.to_thread(self.exchange_code_for_token, auth_code)
+    
+    @staticmethod
+    def _extract_auth_code(callback_url: str) -> str:
+        """Extract the authorization code from an OAuth callback URL."""
         parsed_url = urlparse(callback_url)
         query_params = parse_qs(parsed_url.query)
         
         if 'code' not in query_params:
             raise ValueError("Authorization code not found in callback URL")
         
-        auth_code = query_params['code'][0]
-        return self.exchange_code_for_token(auth_code)
+        return query_params['code'][0]
+    
+    def _request_token(self, token_data: Dict[str, str]) -> Dict[str, Any]:
+        """POST to the token endpoint and return the validated token response."""
+        # Make token request over the pooled session without the stale bearer token
+        response = self.session.post(
+            self.token_url,
+            data=token_data,
+            timeout=HTTP_TIMEOUT,
+            headers={'Authorization': None}
+        )
+        
+        logger.info(f"Token response status: {response.status_code}")
+        logger.debug("Token response headers: %s", dict(response.headers))
+        
+        response.raise_for_status()
+        token_response = response.json()
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Token response: %s", _redact_tokens(token_response))
+        
+        if 'access_token' not in token_response:
+            raise ValueError(f"Access token not found in response: {_redact_tokens(token_response)}")
+        
+        return token_response
+    
+    def _apply_token_response(self, token_response: Dict[str, Any]):
+        """Switch the client to newly issued tokens and persist them if configured."""
+        self.access_token = token_response['access_token']
+        self.refresh_token = token_response.get('refresh_token', self.refresh_token)
+        expires_in = token_response.get('expires_in')
+        self.expires_at = time.time() + float(expires_in) if expires_in else None
+        
+        self._current_user = None
+        self.invalidate_cache()
+        self.session.headers['Authorization'] = f'Bearer {self.access_token}'
+        
+        if self.token_store:
+            self.token_store.save(self.get_token_data())
+    
+    def get_token_data(self) -> Dict[str, Any]:
+        """Get the current tokens in the format kept by TokenStore."""
+        return {
+            'access_token': self.access_token,
+            'refresh_token': self.refresh_token,
+            'expires_at': self.expires_at
+        }
     
     def exchange_code_for_token(self, auth_code: str) -> str:
         """Exchange authorization code for access token."""
@@ -87,41 +296,118 @@ class SplitwiseClient:
                 'redirect_uri': self.redirect_uri
             }
             
-            # Make token request
-            response = requests.post(
-                self.token_url,
-                data=token_data,
-                headers={'Accept': 'application/json'}
-            )
-            
-            logger.info(f"Token response status: {response.status_code}")
-            logger.info(f"Token response headers: {dict(response.headers)}")
-            
-            response.raise_for_status()
-            token_response = response.json()
-            
-            logger.info(f"Token response: {token_response}")
-            
-            if 'access_token' not in token_response:
-                raise ValueError(f"Access token not found in response: {token_response}")
-            
-            self.access_token = token_response['access_token']
-            self.session.headers.update({
-                'Authorization': f'Bearer {self.access_token}',
-                'Content-Type': 'application/json'
-            })
+            self._apply_token_response(self._request_token(token_data))
             
             logger.info("Successfully obtained access token")
             return self.access_token
             
         except requests.exceptions.HTTPError as e:
             logger.error(f"HTTP error during token exchange: {e}")
-            logger.error(f"Response content: {e.response.text if e.response else 'No response'}")
+            logger.error(f"Response content: {_error_body(e.response)}")
             raise
         except Exception as e:
             logger.error(f"Error exchanging code for token: {e}")
             raise
     
+    def refresh_access_token(self, refresh_token: Optional[str] = None) -> str:
+        """Obtain a new access token using a refresh token."""
+        refresh_token = refresh_token or self.refresh_token
+        if not refresh_token:
+            raise ValueError("Refresh token is required to refresh the access token")
+        
+        try:
+            token_data = {
+                'client_id': self.client_id,
+                'client_secret': self.client_secret,
+                'grant_type': 'refresh_token',
+                'refresh_token': refresh_token
+            }
+            
+            self.refresh_token = refresh_token
+            self._apply_token_response(self._request_token(token_data))
+            
+            logger.info("Successfully refreshed access token")
+            return self.access_token
+            
+        except requests.exceptions.HTTPError as e:
+            logger.error(f"HTTP error during token refresh: {e}")
+            logger.error(f"Response content: {_error_body(e.response)}")
+            raise
+        except Exception as e:
+            logger.error(f"Error refreshing access token: {e}")
+            raise
+    
+    def _discard_stored_tokens(self):
+        """Delete stored tokens that can no longer be used, so the next run re-authorizes.
+        
+        Only tokens matching the client's rejected access token are deleted, so an
+        explicitly given token that fails leaves the user's stored tokens alone.
+        """
+        if not self.token_store:
+            return
+        
+        stored_tokens = self.token_store.load()
+        if stored_tokens and stored_tokens.get('access_token') == self.access_token:
+            logger.warning("Stored Splitwise tokens were rejected, clearing them")
+            self.token_store.clear()
+    
+    def _refresh_or_discard(self):
+        """Refresh the access token, discarding stored tokens if the refresh is rejected."""
+        try:
+            self.refresh_access_token()
+        except requests.exceptions.HTTPError as e:
+            # Server errors may be transient, so only a rejected refresh token is dropped
+            if e.response is None or e.response.status_code < 500:
+                self._discard_stored_tokens()
+            raise
+        except ValueError:
+            self._discard_stored_tokens()
+            raise
+    
+    def is_token_expiring(self) -> bool:
+        """Check whether the access token is refreshable and expired or about to expire."""
+        return bool(self.refresh_token and self.expires_at and
+                    TokenStore.is_expired(self.get_token_data()))
+    
+    def ensure_fresh_token(self):
+        """Refresh the access token if it is expired or about to expire."""
+        if not self.is_token_expiring():
+            return
+        
+        with self._refresh_lock:
+            # Another caller may have refreshed while this one waited
+            if self.is_token_expiring():
+                logger.info("Access token is about to expire, refreshing")
+                self._refresh_or_discard()
+    
+    def handle_unauthorized(self, rejected_token: str) -> bool:
+        """Recover from a 401 response to a request sent with rejected_token.
+        
+        Returns True if the request should be retried with the current access token.
+        A rejected token that cannot be refreshed is removed from the token store.
+        """
+        with self._refresh_lock:
+            # Another caller already replaced the rejected token
+            if self.access_token != rejected_token:
+                return True
+            
+            if not self.refresh_token:
+                self._discard_stored_tokens()
+                return False
+            
+            logger.info("Access token was rejected, refreshing and retrying")
+            self._refresh_or_discard()
+            return True
+    
+    def _send_request(self, method: str, url: str, data: Optional[Dict] = None) -> requests.Response:
+        """Send a request with the current session credentials."""
+        if method.upper() == 'GET':
+            return self.session.get(url, params=data, timeout=HTTP_TIMEOUT)
+        elif method.upper() == 'POST':
+            return self.session.post(url, data=to_json(data), headers=JSON_HEADERS, timeout=HTTP_TIMEOUT)
+        else:
+            raise ValueError(f"Unsupported HTTP method: {method}")
+    
     def _make_request(self, method: str, endpoint: str, 
                      data: Optional[Dict] = None) -> Dict[str, Any]:
         """Make authenticated request to Splitwise API."""
@@ -130,28 +416,33 @@ class SplitwiseClient:
         
         url = f"{self.base_url}/{endpoint}"
         
+        # Refresh only when the token is expired or about to expire
+        self.ensure_fresh_token()
+        
         try:
-            if method.upper() == 'GET':
-                response = self.session.get(url, params=data)
-            elif method.upper() == 'POST':
-                response = self.session.post(url, json=data)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
+            sent_token = self.access_token
+            response = self._send_request(method, url, data)
+            
+            # A rejected token is refreshed and the request retried once
+            if response.status_code == 401 and self.handle_unauthorized(sent_token):
+                response = self._send_request(method, url, data)
             
             response.raise_for_status()
-            return response.json()
+            return _decode_json(response)
             
         except requests.exceptions.HTTPError as e:
             logger.error(f"HTTP error: {e}")
-            logger.error(f"Response content: {response.text}")
+            logger.error(f"Response content: {_error_body(e.response)}")
             raise
         except requests.exceptions.RequestException as e:
             logger.error(f"Request error: {e}")
             raise
     
     def get_current_user(self) -> Dict[str, Any]:
-        """Get current user information."""
-        return self._make_request('GET', 'get_current_user')
+        """Get current user information (cached for the active access token)."""
+        if self._current_user is None:
+            self._current_user = self._make_request('GET', 'get_current_user')
+        return self._current_user
     
     def get_friends(self) -> List[Dict[str, Any]]:
         """Get list of friends."""
@@ -168,78 +459,93 @@ class SplitwiseClient:
         response = self._make_request('GET', 'get_categories')
         return response.get('categories', [])
     
-    def find_user_by_name_or_email(self, identifier: str) -> Optional[Dict[str, Any]]:
-        """Find a user by name or email from friends list."""
-        friends = self.get_friends()
+    def _is_fresh(self, cache_time: float) -> bool:
+        """Check whether a cache filled at cache_time is still within its TTL."""
+        return time.monotonic() - cache_time < self.lookup_cache_ttl
+    
+    def invalidate_cache(self):
+        """Drop cached friends and categories so the next lookup refetches them."""
+        self._friends_cache = None
+        self._categories_cache = None
+    
+    def get_friends_cached(self) -> List[Dict[str, Any]]:
+        """Get list of friends, refetching and re-indexing only when the cache is stale."""
+        if self._friends_cache is None or not self._is_fresh(self._friends_cache_time):
+            with self._friends_cache_lock:
+                # Another thread may have refetched while this one waited
+                if self._friends_cache is None or not self._is_fresh(self._friends_cache_time):
+                    friends = self.get_friends()
+                    friends_by_email: Dict[str, Dict[str, Any]] = {}
+                    friends_by_name: Dict[str, Dict[str, Any]] = {}
+            
+                    for friend in friends:
+                        email = (friend.get('email') or '').lower()
+                        first_name = (friend.get('first_name') or '').lower()
+                        last_name = (friend.get('last_name') or '').lower()
+                        full_name = f"{first_name} {last_name}".strip()
+                
+                        # Earlier friends win on shared keys, matching the order of the friends list
+                        if email:
+                            friends_by_email.setdefault(email, friend)
+                        for name in (first_name, last_name, full_name):
+                            if name:
+                                friends_by_name.setdefault(name, friend)
+            
+                    self._friends_cache = friends
+                    self._friends_by_email = friends_by_email
+                    self._friends_by_name = friends_by_name
+                    self._friends_cache_time = time.monotonic()
         
-        for friend in friends:
-            # Check email match
-            if friend.get('email', '').lower() == identifier.lower():
-                return friend
+        return self._friends_cache
+    
+    def get_categories_cached(self) -> List[Dict[str, Any]]:
+        """Get list of expense categories, refetching only when the cache is stale."""
+        if self._categories_cache is None or not self._is_fresh(self._categories_cache_time):
+            with self._categories_cache_lock:
+                # Another thread may have refetched while this one waited
+                if self._categories_cache is None or not self._is_fresh(self._categories_cache_time):
+                    categories = self.get_categories()
+                    category_index: Dict[str, int] = {}
             
-            # Check name match (first name, last name, or full name)
-            first_name = friend.get('first_name', '').lower()
-            last_name = friend.get('last_name', '').lower()
-            full_name = f"{first_name} {last_name}".strip()
+                    for category in categories:
+                        subcategories = category.get('subcategories', [])
+                
+                        # A parent category name resolves to its "Other" subcategory. Earlier
+                        # entries win on shared names, matching the order of the categories list.
+                        other_id = next(
+                            (subcat['id'] for subcat in subcategories if subcat['name'].lower() == 'other'),
+                            None
+                        )
+                        if other_id is not None:
+                            category_index.setdefault(category['name'].lower(), other_id)
+                        for subcat in subcategories:
+                            category_index.setdefault(subcat['name'].lower(), subcat['id'])
             
-            if (first_name == identifier.lower() or 
-                last_name == identifier.lower() or 
-                full_name == identifier.lower()):
-                return friend
+                    self._categories_cache = categories
+                    self._category_index = category_index
+                    self._categories_cache_time = time.monotonic()
         
-        return None
+        return self._categories_cache
+    
+    def find_user_by_name_or_email(self, identifier: str) -> Optional[Dict[str, Any]]:
+        """Find a user by name or email from friends list."""
+        self.get_friends_cached()
+        key = identifier.strip().lower()
+        return self._friends_by_email.get(key) or self._friends_by_name.get(key)
     
     def find_category_by_name(self, category_name: str) -> Optional[int]:
         """Find category ID by name."""
         if not category_name:
             return None
         
-        categories = self.get_categories()
-        category_name_lower = category_name.lower()
-        
-        # Search in main categories and subcategories
-        for category in categories:
-            if category['name'].lower() == category_name_lower:
-                # This is a parent category, look for "Other" subcategory
-                subcategories = category.get('subcategories', [])
-                for subcat in subcategories:
-                    if subcat['name'].lower() == 'other':
-                        return subcat['id']
-            
-            # Search subcategories
-            subcategories = category.get('subcategories', [])
-            for subcat in subcategories:
-                if subcat['name'].lower() == category_name_lower:
-                    return subcat['id']
-        
-        return None
+        self.get_categories_cached()
+        return self._category_index.get(category_name.strip().lower())
     
     def create_expense(self, expense: SplitwiseExpense) -> SplitwiseExpenseResponse:
         """Create a new expense in Splitwise."""
-        expense_data = expense.dict(exclude_none=True)
-        
-        # Convert users list to the format expected by Splitwise API
-        if 'users' in expense_data:
-            users_list = []
-            for user in expense_data['users']:
-                user_data = {
-                    'user_id': user['user_id'],
-                    'paid_share': user['paid_share'],
-                    'owed_share': user['owed_share']
-                }
-                users_list.append(user_data)
-            expense_data['users'] = users_list
-        
-        logger.info(f"Creating expense with data: {json.dumps(expense_data, indent=2)}")
-        
+        expense_data = _build_expense_payload(expense)
         response = self._make_request('POST', 'create_expense', expense_data)
-        logger.info(f"Splitwise response: {json.dumps(response, indent=2)}")
-        
-        # Check if response contains errors
-        if 'errors' in response and response['errors']:
-            raise ValueError(f"Splitwise API error: {response['errors']}")
-        
-        return SplitwiseExpenseResponse(**response)
+        return _parse_expense_response(response)
     
     def get_expenses(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get list of recent expenses."""
@@ -247,7 +553,151 @@ class SplitwiseClient:
         response = self._make_request('GET', 'get_expenses', params)
         return response.get('expenses', [])
 
+class AsyncSplitwiseClient:
+    """Async client for the Splitwise API, for use inside an event loop.
+    
+    OAuth stays with SplitwiseClient; this client is created from an access token
+    that has already been obtained. When given the SplitwiseClient that owns the
+    token, expired or rejected tokens are refreshed through it. Pooled connections
+    are bound to the event loop that first uses the client.
+    """
+    
+    def __init__(self, access_token: str, auth_client: Optional[SplitwiseClient] = None):
+        """Initialize the async Splitwise client."""
+        if not access_token:
+            raise ValueError("Access token is required. Please authenticate first.")
+        
+        self.access_token = access_token
+        self.auth_client = auth_client
+        self.base_url = config.SPLITWISE_BASE_URL
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={'Authorization': f'Bearer {access_token}'},
+            limits=httpx.Limits(
+                max_connections=ASYNC_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=ASYNC_HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=ASYNC_HTTP_KEEPALIVE_EXPIRY
+            ),
+            timeout=ASYNC_HTTP_TIMEOUT
+        )
+    
+    def set_access_token(self, access_token: str):
+        """Switch to a new access token, e.g. after a refresh, keeping pooled connections."""
+        self.access_token = access_token
+        self.client.headers['Authorization'] = f'Bearer {access_token}'
+    
+    async def aclose(self):
+        """Close the HTTP client and its pooled connections."""
+        await self.client.aclose()
+    
+    async def __aenter__(self):
+        """Enter a context that closes the client on exit."""
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """Close the client when leaving the context."""
+        await self.aclose()
+    
+    def _sync_access_token(self):
+        """Pick up a token the auth client obtained since the last request."""
+        if self.auth_client.access_token != self.access_token:
+            self.set_access_token(self.auth_client.access_token)
+    
+    async def _send_request(self, method: str, endpoint: str,
+                            data: Optional[Dict] = None) -> httpx.Response:
+        """Send a request with the current access token."""
+        if method.upper() == 'GET':
+            return await self.client.get(endpoint, params=data)
+        elif method.upper() == 'POST':
+            return await self.client.post(endpoint, content=to_json(data), headers=JSON_HEADERS)
+        else:
+            raise ValueError(f"Unsupported HTTP method: {method}")
+    
+    async def _make_request(self, method: str, endpoint: str,
+                            data: Optional[Dict] = None) -> Dict[str, Any]:
+        """Make authenticated request to Splitwise API."""
+        # Token refreshes go through the sync client in a worker thread, sharing
+        # its refresh lock and token store
+        if self.auth_client is not None:
+            if self.auth_client.is_token_expiring():
+                await asyncio.to_thread(self.auth_client.ensure_fresh_token)
+            self._sync_access_token()
+        
+        try:
+            sent_token = self.access_token
+            response = await self._send_request(method, endpoint, data)
+            
+            # A rejected token is refreshed and the request retried once
+            if (response.status_code == 401 and self.auth_client is not None and
+                    await asyncio.to_thread(self.auth_client.handle_unauthorized, sent_token)):
+                self._sync_access_token()
+                response = await self._send_request(method, endpoint, data)
+            
+            response.raise_for_status()
+            return _decode_json(response)
+            
+        except httpx.HTTPStatusError as e:
+            logger.error(f"HTTP error: {e}")
+            logger.error(f"Response content: {_error_body(e.response)}")
+            raise
+        except httpx.RequestError as e:
+            logger.error(f"Request error: {e}")
+            raise
+    
+    async def get_current_user(self) -> Dict[str, Any]:
+        """Get current user information."""
+        return await self._make_request('GET', 'get_current_user')
+    
+    async def get_friends(self) -> List[Dict[str, Any]]:
+        """Get list of friends."""
+        response = await self._make_request('GET', 'get_friends')
+        return response.get('friends', [])
+    
+    async def get_groups(self) -> List[Dict[str, Any]]:
+        """Get list of groups."""
+        response = await self._make_request('GET', 'get_groups')
+        return response.get('groups', [])
+    
+    async def get_categories(self) -> List[Dict[str, Any]]:
+        """Get list of expense categories."""
+        response = await self._make_request('GET', 'get_categories')
+        return response.get('categories', [])
+    
+    async def info_bundle(self) -> Tuple[Dict[str, Any], List[Dict[str, Any]],
+                                         List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Fetch current user, friends, groups and categories concurrently."""
+        return await asyncio.gather(
+            self.get_current_user(),
+            self.get_friends(),
+            self.get_groups(),
+            self.get_categories()
+        )
+    
+    async def create_expense(self, expense: SplitwiseExpense) -> SplitwiseExpenseResponse:
+        """Create a new expense in Splitwise."""
+        expense_data = _build_expense_payload(expense)
+        response = await self._make_request('POST', 'create_expense', expense_data)
+        return _parse_expense_response(response)
+    
+    async def get_expenses(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get list of recent expenses."""
+        params = {'limit': limit}
+        response = await self._make_request('GET', 'get_expenses', params)
+        return response.get('expenses', [])
+
 # Factory function for creating client instance
-def create_splitwise_client(access_token: Optional[str] = None) -> SplitwiseClient:
+def create_splitwise_client(access_token: Optional[str] = None, refresh_token: Optional[str] = None,
+                            expires_at: Optional[float] = None,
+                            token_store: Optional[TokenStore] = None) -> SplitwiseClient:
     """Create and return a SplitwiseClient instance."""
-    return SplitwiseClient(access_token=access_token) 
\ No newline at end of file
+    return SplitwiseClient(
+        access_token=access_token,
+        refresh_token=refresh_token,
+        expires_at=expires_at,
+        token_store=token_store
+    ) 
+
+def create_async_splitwise_client(access_token: str,
+                                  auth_client: Optional[SplitwiseClient] = None) -> AsyncSplitwiseClient:
+    """Create and return an AsyncSplitwiseClient instance."""
+    return AsyncSplitwiseClient(access_token=access_token, auth_client=auth_client)
\ No newline at end of file
@@ -1,37 +1,49 @@
-"""Test script to verify expense forwarder functionality."""
+"""Tests to verify expense forwarder functionality."""
 
+import asyncio
+import importlib.util
 import json
-from models import EmailContent, ParsedExpense
+import os
+import stat
+import time
+from collections import OrderedDict
+from typing import Final
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+import httpx
+import requests
+from pydantic import ValidationError
+from models import EmailContent, OpenAIResponse, ParsedExpense, SplitwiseExpenseResponse
+from batch_ledger import BatchLedger
+import config as config_module
+from config import Config
+import email_parser
 from email_parser import EmailParser
-from config import config
+from expense_converter import create_expense_converter, format_amount
+from main import ExpenseForwarder, _fetch_info_bundle
+from splitwise_client import AsyncSplitwiseClient, SplitwiseClient
+from token_store import TokenStore
 
-def test_email_parsing():
-    """Test email parsing without actually calling OpenAI (mock response)."""
+# Sample dinner receipt email, validated once at import
+_SAMPLE_EMAIL: Final = EmailContent(
+    subject="Dinner Receipt - Pizza Palace",
+    body="""
+    Hi everyone!
     
-    print("Testing Email Parsing...")
-    print("=" * 40)
+    Had a great dinner at Pizza Palace last night.
+    Total bill came to $67.50 including tip.
     
-    # Sample email content
-    email_content = EmailContent(
-        subject="Dinner Receipt - Pizza Palace",
-        body="""
-        Hi everyone!
-        
-        Had a great dinner at Pizza Palace last night.
-        Total bill came to $67.50 including tip.
-        
-        Let's split this equally between me, John, and Sarah.
-        
-        Thanks!
-        Mike
-        """
-    )
+    Let's split this equally between me, John, and Sarah.
     
-    print(f"Subject: {email_content.subject}")
-    print(f"Body: {email_content.body[:100]}...")
-    
-    # Mock parsed response (what OpenAI would return)
-    mock_parsed_expense = ParsedExpense(
+    Thanks!
+    Mike
+    """
+)
+
+@pytest.fixture(scope="module")
+def mock_parsed_expense():
+    """Parsed expense as OpenAI would return it for the sample email."""
+    return ParsedExpense(
         description="Dinner at Pizza Palace",
         amount=67.50,
         currency="USD",
@@ -40,92 +52,679 @@ def test_email_parsing():
         paid_by="Mike",
         category="Food"
     )
+
+@pytest.fixture
+def mock_openai_client():
+    """OpenAI client stand-in returning a canned parse of the sample email."""
+    payload = {
+        "parsed_expense": {
+            "description": "Dinner at Pizza Palace",
+            "amount": 67.50,
+            "currency": "USD",
+            "participants": ["John", "Sarah"],
+            "split_type": "equal",
+            "paid_by": "Mike",
+            "category": "Food"
+        },
+        "confidence": 0.9,
+        "email_summary": "Mike paid for dinner at Pizza Palace, split with John and Sarah."
+    }
     
-    print(f"\nParsed Expense:")
-    print(f"  Description: {mock_parsed_expense.description}")
-    print(f"  Amount: ${mock_parsed_expense.amount}")
-    print(f"  Participants: {', '.join(mock_parsed_expense.participants)}")
-    print(f"  Split Type: {mock_parsed_expense.split_type}")
-    print(f"  Paid By: {mock_parsed_expense.paid_by}")
-    print(f"  Category: {mock_parsed_expense.category}")
+    # Clear the shared client so EmailParser builds one from the patched class
+    with patch("email_parser.OpenAI") as mock_openai, patch("email_parser._sync_client", None):
+        client = mock_openai.return_value
+        client.chat.completions.create.return_value = MagicMock(
+            choices=[MagicMock(message=MagicMock(content=json.dumps(payload)))]
+        )
+        yield client
 
-def test_configuration():
-    """Test configuration loading."""
+@pytest.fixture
+def mock_config(monkeypatch):
+    """The real Config with canned settings, so tests need no .env or secrets."""
+    settings = {
+        "OPENAI_API_KEY": "test-openai-key",
+        "OPENAI_MODEL": "gpt-4o-mini",
+        "OPENAI_RESPONSE_CACHE_SIZE": 0,  # Keep parsing tests independent of each other
+        "SPLITWISE_CLIENT_ID": "test-client-id",
+        "SPLITWISE_CLIENT_SECRET": "test-client-secret",
+        "DEFAULT_CURRENCY": "USD"
+    }
+    for name, value in settings.items():
+        monkeypatch.setattr(Config, name, value)
+    monkeypatch.delenv("DEFAULT_GROUP_ID", raising=False)
+    return Config
+
+def test_email_parsing(mock_parsed_expense, mock_config, mock_openai_client):
+    """Test email parsing against a mocked OpenAI client."""
+    
+    result = EmailParser().parse_email(_SAMPLE_EMAIL)
+    
+    assert result.parsed_expense == mock_parsed_expense
+    assert result.confidence == 0.9
+    
+    # The email content is sent to the configured model
+    request = mock_openai_client.chat.completions.create.call_args.kwargs
+    assert request["model"] == "gpt-4o-mini"
+    assert _SAMPLE_EMAIL.subject in request["messages"][-1]["content"]
+
+def test_parse_context(mock_config, mock_openai_client):
+    """Test that the Splitwise category directory is sent to OpenAI."""
+    with patch.object(SplitwiseClient, "get_current_user", return_value={"user": {"id": 1}}):
+        forwarder = ExpenseForwarder(access_token="test-access-token")
+    categories = [{"id": 12, "name": "Food and drink", "subcategories": [{"id": 13, "name": "Dining out"}]}]
+    
+    with patch.object(forwarder.splitwise_client, "get_categories", return_value=categories) as get_categories:
+        context = forwarder._build_parse_context()
+        assert forwarder._build_parse_context() == context
+    get_categories.assert_called_once()
     
-    print("\nTesting Configuration...")
-    print("=" * 40)
+    EmailParser().parse_email(_SAMPLE_EMAIL, context)
     
-    print(f"OpenAI Model: {config.OPENAI_MODEL}")
-    print(f"Default Currency: {config.DEFAULT_CURRENCY}")
-    print(f"Splitwise Base URL: {config.SPLITWISE_BASE_URL}")
+    messages = mock_openai_client.chat.completions.create.call_args.kwargs["messages"]
+    assert '{"id":13,"name":"Food and drink - Dining out"}' in messages[1]["content"]
+    assert _SAMPLE_EMAIL.subject in messages[-1]["content"]
     
-    # Check if API keys are configured (don't print them)
-    print(f"OpenAI API Key configured: {'Yes' if config.OPENAI_API_KEY else 'No'}")
-    print(f"Splitwise Client ID configured: {'Yes' if config.SPLITWISE_CLIENT_ID else 'No'}")
-    print(f"Splitwise Client Secret configured: {'Yes' if config.SPLITWISE_CLIENT_SECRET else 'No'}")
+    # Emails are still parsed, without a directory, when Splitwise is unreachable or malformed
+    forwarder.splitwise_client.invalidate_cache()
+    for error in (requests.ConnectionError, ValueError("invalid JSON")):
+        with patch.object(forwarder.splitwise_client, "get_categories", side_effect=error):
+            assert forwarder._build_parse_context() is None
+
+def test_configuration(mock_config, monkeypatch):
+    """Test configuration loading."""
+    # Load a fresh copy of config.py with an empty environment to see its defaults
+    for name in ["OPENAI_MODEL", "OPENAI_RESPONSE_CACHE_SIZE", "DEFAULT_CURRENCY", "TOKEN_STORE_PATH",
+                 "BATCH_LEDGER_PATH", "SPLITWISE_LOOKUP_CACHE_TTL", "SPLITWISE_REDIRECT_URI"]:
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("_EXPENSE_FWD_DOTENV_LOADED", "1")  # Skip reading a local .env
+    spec = importlib.util.spec_from_file_location("config_defaults", config_module.__file__)
+    defaults = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(defaults)
+    
+    expected_settings = [
+        ("OPENAI_MODEL", "gpt-4"),
+        ("OPENAI_RESPONSE_CACHE_SIZE", 2048),
+        ("DEFAULT_CURRENCY", "USD"),
+        ("TOKEN_STORE_PATH", "~/.config/expense_forwarder/token.json"),
+        ("BATCH_LEDGER_PATH", "~/.config/expense_forwarder/batches.jsonl"),
+        ("SPLITWISE_LOOKUP_CACHE_TTL", 900),
+        ("SPLITWISE_REDIRECT_URI", "http://localhost:8080/callback"),
+        ("SPLITWISE_BASE_URL", "https://secure.splitwise.com/api/v3.0"),
+        ("SPLITWISE_AUTH_URL", "https://secure.splitwise.com/oauth/authorize"),
+        ("SPLITWISE_TOKEN_URL", "https://secure.splitwise.com/oauth/token")
+    ]
+    for name, expected in expected_settings:
+        assert getattr(defaults.Config, name) == expected, name
+    
+    # validate() reports whether every API key is configured
+    assert mock_config.validate() is True
+    for name in ["OPENAI_API_KEY", "SPLITWISE_CLIENT_ID", "SPLITWISE_CLIENT_SECRET"]:
+        with monkeypatch.context() as patched:
+            patched.setattr(mock_config, name, None)
+            assert mock_config.validate() is False, name
     
-    print(f"\nConfiguration valid: {config.validate()}")
+    # The default group ID ignores the .env template placeholder and non-numeric values
+    assert mock_config._get_default_group_id() is None
+    expected_group_ids = [("12345", 12345), ("your_default_group_id_here", None), ("not-a-number", None)]
+    for value, expected in expected_group_ids:
+        monkeypatch.setenv("DEFAULT_GROUP_ID", value)
+        assert mock_config._get_default_group_id() == expected, value
 
 def test_data_models():
     """Test Pydantic data models."""
     
-    print("\nTesting Data Models...")
-    print("=" * 40)
-    
     # Test ParsedExpense model
-    try:
-        expense = ParsedExpense(
-            description="Test expense",
-            amount=25.50,
-            currency="USD",
-            participants=["Alice", "Bob"],
-            split_type="equal"
-        )
-        print(f"✅ ParsedExpense model works: {expense.description} - ${expense.amount}")
-    except Exception as e:
-        print(f"❌ ParsedExpense model error: {e}")
+    expense = ParsedExpense(
+        description="Test expense",
+        amount=25.50,
+        currency="USD",
+        participants=["Alice", "Bob"],
+        split_type="equal"
+    )
+    assert expense.description == "Test expense"
+    assert expense.amount == 25.50
     
     # Test EmailContent model
-    try:
-        email = EmailContent(
-            subject="Test Subject",
-            body="Test body content"
-        )
-        print(f"✅ EmailContent model works: {email.subject}")
-    except Exception as e:
-        print(f"❌ EmailContent model error: {e}")
-    
-    # Test invalid data
-    try:
-        invalid_expense = ParsedExpense(
-            description="",  # Empty description should fail validation
-            amount=-5,  # Negative amount should fail
-            currency="INVALID"  # Invalid currency should fail
-        )
-        print(f"❌ Validation should have failed but didn't")
-    except Exception as e:
-        print(f"✅ Validation correctly failed: {type(e).__name__}")
+    email = EmailContent(
+        subject="Test Subject",
+        body="Test body content"
+    )
+    assert email.subject == "Test Subject"
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"description": "", "amount": 25.0, "currency": "USD"},
+        {"description": "Test expense", "amount": -5, "currency": "USD"},
+        {"description": "Test expense", "amount": 5, "currency": "INVALID"}
+    ],
+    ids=["empty_desc", "negative_amount", "bad_currency"]
+)
+def test_parsed_expense_validation(kwargs):
+    """Test that each invalid ParsedExpense field is rejected."""
+    with pytest.raises(ValidationError):
+        ParsedExpense(**kwargs)
 
-def main():
-    """Run all tests."""
+def _mock_response(status_code, payload):
+    """requests.Response stand-in carrying a JSON payload."""
+    return MagicMock(status_code=status_code, content=json.dumps(payload).encode(), json=MagicMock(return_value=payload))
+
+@pytest.fixture
+def token_store(tmp_path):
+    """Token store in a not yet created directory under tmp_path."""
+    return TokenStore(str(tmp_path / "config" / "token.json"))
+
+def test_token_store(token_store):
+    """Test that tokens round-trip through a file only the owner can read."""
+    assert token_store.load() is None
+    
+    tokens = {"access_token": "access", "refresh_token": "refresh", "expires_at": 1234.5}
+    token_store.save(tokens)
     
-    print("Expense Forwarder Test Suite")
-    print("=" * 50)
+    assert token_store.load() == tokens
+    assert stat.S_IMODE(os.stat(token_store.path).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(token_store.path.parent).st_mode) == 0o700
     
-    try:
-        test_configuration()
-        test_data_models()
-        test_email_parsing()
+    token_store.clear()
+    assert token_store.load() is None
+
+@pytest.mark.parametrize(
+    "expires_in, expired",
+    [(None, False), (3600, False), (30, True), (-10, True)],
+    ids=["no_expiry", "valid", "within_margin", "past"]
+)
+def test_token_expiry(expires_in, expired):
+    """Test that tokens within the expiry margin count as expired."""
+    expires_at = None if expires_in is None else time.time() + expires_in
+    assert TokenStore.is_expired({"access_token": "access", "expires_at": expires_at}) is expired
+
+def test_proactive_token_refresh(mock_config, token_store):
+    """Test that a token about to expire is refreshed before the request is sent."""
+    user = {"user": {"id": 1}}
+    with SplitwiseClient(access_token="old", refresh_token="refresh",
+                         expires_at=time.time() + 10, token_store=token_store) as client, \
+            patch.object(client.session, "post", return_value=_mock_response(
+                200, {"access_token": "new", "expires_in": 3600})) as post, \
+            patch.object(client.session, "get", return_value=_mock_response(200, user)) as get:
+        assert client.get_current_user() == user
         
-        print("\n" + "=" * 50)
-        print("✅ All basic tests completed!")
-        print("\nTo test the full functionality:")
-        print("1. Set up your .env file with API keys")
-        print("2. Run: python main.py --auth-only --subject '' --body ''")
-        print("3. Then try: python main.py --subject 'Test' --body 'Dinner $30 with John'")
+        post.assert_called_once()
+        assert post.call_args.kwargs["data"]["grant_type"] == "refresh_token"
+        get.assert_called_once()
+        assert client.session.headers["Authorization"] == "Bearer new"
+    
+    # The refreshed tokens are persisted, keeping the old refresh token
+    stored = token_store.load()
+    assert stored["access_token"] == "new"
+    assert stored["refresh_token"] == "refresh"
+
+def test_token_refresh_on_unauthorized(mock_config):
+    """Test that a rejected token is refreshed and the request retried once."""
+    user = {"user": {"id": 1}}
+    with SplitwiseClient(access_token="old", refresh_token="refresh") as client, \
+            patch.object(client.session, "post", return_value=_mock_response(
+                200, {"access_token": "new", "refresh_token": "refresh-2"})) as post, \
+            patch.object(client.session, "get", side_effect=[
+                _mock_response(401, {"error": "invalid_token"}), _mock_response(200, user)]) as get:
+        assert client.get_current_user() == user
         
-    except Exception as e:
-        print(f"\n❌ Test failed with error: {e}")
+        post.assert_called_once()
+        assert get.call_count == 2
+        assert client.get_token_data()["refresh_token"] == "refresh-2"
+        assert client.session.headers["Authorization"] == "Bearer new"
+
+def _error_response(status_code):
+    """Real requests.Response with an error status, so raise_for_status() raises."""
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = b'{"error": "invalid_token"}'
+    return response
+
+def _mock_async_client(handler, access_token="token", auth_client=None):
+    """AsyncSplitwiseClient whose requests are answered by handler instead of the network."""
+    client = AsyncSplitwiseClient(access_token, auth_client=auth_client)
+    client.client = httpx.AsyncClient(base_url=client.base_url, headers=client.client.headers,
+                                      transport=httpx.MockTransport(handler))
+    return client
+
+def test_revoked_token_is_cleared(mock_config, token_store):
+    """Test that a rejected stored token without a refresh token is removed from the store."""
+    token_store.save({"access_token": "revoked", "refresh_token": None, "expires_at": None})
+    
+    with patch("main.create_token_store", return_value=token_store), \
+            patch.object(requests.Session, "get", return_value=_error_response(401)):
+        forwarder = ExpenseForwarder()
+    
+    # The converter could not load the user, so main() re-authenticates
+    assert forwarder.splitwise_client.access_token == "revoked"
+    assert forwarder.expense_converter is None
+    assert token_store.load() is None
+
+def test_async_token_refresh_on_unauthorized(mock_config, token_store):
+    """Test that the async client refreshes a rejected token through the sync client."""
+    user = {"user": {"id": 1}}
+    auth_client = SplitwiseClient(access_token="old", refresh_token="refresh", token_store=token_store)
+    sent_tokens = []
+    
+    def handler(request):
+        sent_tokens.append(request.headers["Authorization"])
+        if request.headers["Authorization"] == "Bearer old":
+            return httpx.Response(401, json={"error": "invalid_token"})
+        return httpx.Response(200, json=user)
+    
+    async def fetch_user():
+        async with _mock_async_client(handler, "old", auth_client) as client:
+            return await client.get_current_user()
+    
+    with auth_client, patch.object(auth_client.session, "post", return_value=_mock_response(
+            200, {"access_token": "new", "expires_in": 3600})) as post:
+        assert asyncio.run(fetch_user()) == user
+    
+    post.assert_called_once()
+    assert sent_tokens == ["Bearer old", "Bearer new"]
+    assert token_store.load()["access_token"] == "new"
+
+def test_async_proactive_token_refresh(mock_config):
+    """Test that the async client refreshes a token about to expire before sending."""
+    sent_tokens = []
+    
+    def handler(request):
+        sent_tokens.append(request.headers["Authorization"])
+        return httpx.Response(200, json={"groups": []})
+    
+    async def fetch_groups(auth_client):
+        async with _mock_async_client(handler, "old", auth_client) as client:
+            return await client.get_groups()
+    
+    with SplitwiseClient(access_token="old", refresh_token="refresh",
+                         expires_at=time.time() + 10) as auth_client, \
+            patch.object(auth_client.session, "post", return_value=_mock_response(
+                200, {"access_token": "new", "expires_in": 3600})) as post:
+        assert asyncio.run(fetch_groups(auth_client)) == []
+    
+    post.assert_called_once()
+    assert sent_tokens == ["Bearer new"]
+
+def test_async_client_per_loop(mock_config):
+    """Test that each event loop gets its own async client and aclose only closes that one."""
+    parser = EmailParser()
+    
+    async def use_client():
+        return parser.async_client, parser.async_client
+    
+    async def use_and_close():
+        client = parser.async_client
+        await parser.aclose()
+        return client
+    
+    with patch("email_parser.AsyncOpenAI", side_effect=lambda **kwargs: MagicMock(close=AsyncMock())):
+        first, again = asyncio.run(use_client())
+        second = asyncio.run(use_and_close())
+    
+    assert first is again
+    assert second is not first
+    second.close.assert_awaited_once()
+    first.close.assert_not_called()
+
+def _batch_output_line(custom_id, content):
+    """One line of an OpenAI batch output file carrying a chat completion."""
+    return json.dumps({
+        "custom_id": custom_id,
+        "response": {"status_code": 200, "body": {"choices": [{"message": {"content": content}}]}}
+    })
+
+def test_batch_submit_and_collect(mock_config, mock_openai_client, tmp_path):
+    """Test that a batch round-trips custom IDs and re-collecting creates no duplicate expenses."""
+    with patch.object(SplitwiseClient, "get_current_user", return_value={"user": {"id": 1}}):
+        forwarder = ExpenseForwarder(access_token="test-access-token")
+    forwarder.email_parser = EmailParser()
+    forwarder.batch_ledger = BatchLedger(str(tmp_path / "batches.json"))
+    categories = [{"id": 12, "name": "Food and drink", "subcategories": [{"id": 13, "name": "Dining out"}]}]
+    forwarder.splitwise_client.get_categories = MagicMock(return_value=categories)
+    
+    # Invalid group IDs are rejected before anything is uploaded
+    for group_id in (None, 0, "123"):
+        with pytest.raises(ValueError):
+            forwarder.submit_batch([("Dinner", "Pizza $45.67", group_id)])
+    mock_openai_client.files.create.assert_not_called()
+    
+    mock_openai_client.files.create.return_value = MagicMock(id="file-in")
+    mock_openai_client.batches.create.return_value = MagicMock(id="batch-1")
+    assert forwarder.submit_batch([("Dinner", "Pizza $45.67", 111), ("Taxi", "Uber $28.50", 222)]) == "batch-1"
+    
+    # Each request carries its position and group, and the category directory
+    uploaded = mock_openai_client.files.create.call_args.kwargs["file"][1].getvalue().decode().splitlines()
+    requests_by_id = {line["custom_id"]: line for line in map(json.loads, uploaded)}
+    assert list(requests_by_id) == ["email-0-group-111", "email-1-group-222"]
+    assert '"id":13' in requests_by_id["email-0-group-111"]["body"]["messages"][1]["content"]
+    
+    parsed = {"parsed_expense": {"description": "Dinner", "amount": 45.67, "category_id": 13}, "confidence": 0.9}
+    mock_openai_client.batches.retrieve.return_value = MagicMock(
+        id="batch-1", status="completed", output_file_id="file-out", request_counts=MagicMock(total=2))
+    mock_openai_client.files.content.return_value = MagicMock(text="\n".join(
+        _batch_output_line(custom_id, json.dumps(parsed)) for custom_id in requests_by_id))
+    created = SplitwiseExpenseResponse(expenses=[{"id": 99}])
+    
+    with patch.object(forwarder.splitwise_client, "create_expense", side_effect=[created, requests.ConnectionError]) as create:
+        first = forwarder.collect_batch("batch-1")
+    assert [result["success"] for result in first] == [True, False]
+    assert create.call_args_list[0].args[0].group_id == 111
+    assert create.call_args_list[0].args[0].category_id == 13
+    
+    # Collecting again only retries the email whose expense was not created
+    with patch.object(forwarder.splitwise_client, "create_expense", return_value=created) as create:
+        second = forwarder.collect_batch("batch-1")
+    create.assert_called_once()
+    assert create.call_args.args[0].group_id == 222
+    assert second[0] == first[0]
+    assert second[1]["success"] is True
+    
+    # Every expense now exists, so the records are dropped and the batch cannot be collected again
+    assert forwarder.batch_ledger.load("batch-1") == {}
+    with patch.object(forwarder.splitwise_client, "create_expense") as create, pytest.raises(ValueError):
+        forwarder.collect_batch("batch-1")
+    create.assert_not_called()
+    
+    # IDs not produced by submit_batch abort before any expense is created
+    mock_openai_client.files.content.return_value = MagicMock(text=_batch_output_line("email-0-group-None", json.dumps(parsed)))
+    with patch.object(forwarder.splitwise_client, "create_expense") as create, pytest.raises(ValueError):
+        forwarder.collect_batch("batch-2")
+    create.assert_not_called()
+
+def test_response_cache(mock_config, mock_openai_client, monkeypatch):
+    """Test that repeated emails hit the response cache and the oldest entry is evicted."""
+    monkeypatch.setattr(Config, "OPENAI_RESPONSE_CACHE_SIZE", 2)
+    monkeypatch.setattr("email_parser._response_cache", OrderedDict())
+    parser = EmailParser()
+    emails = [EmailContent(subject=f"Receipt {idx}", body="Pizza $45.67") for idx in range(3)]
+    create = mock_openai_client.chat.completions.create
+    
+    first = parser.parse_email(emails[0])
+    assert parser.parse_email(emails[0]) == first
+    assert create.call_count == 1
+    
+    # Caching two more emails evicts the least recently used one
+    parser.parse_email(emails[1])
+    parser.parse_email(emails[2])
+    parser.parse_email(emails[2])
+    assert create.call_count == 3
+    parser.parse_email(emails[0])
+    assert create.call_count == 4
+
+def test_parse_email_multi(mock_config, mock_openai_client, monkeypatch):
+    """Test that emails are chunked per request and cached emails are not sent again."""
+    monkeypatch.setattr(Config, "OPENAI_RESPONSE_CACHE_SIZE", 16)
+    monkeypatch.setattr("email_parser._response_cache", OrderedDict())
+    parser = EmailParser()
+    emails = [EmailContent(subject=f"Receipt {idx}", body=f"Taxi ${idx + 10}") for idx in range(5)]
+    create = mock_openai_client.chat.completions.create
+    
+    def multi_response(**request):
+        # One result per email, sized from the per-email token budget
+        count = request["max_tokens"] // email_parser.MULTI_EMAIL_MAX_TOKENS_PER_EMAIL
+        results = [
+            {"id": idx, "parsed_expense": {"description": f"Taxi {idx}", "amount": 10 + idx}, "confidence": 0.8}
+            for idx in range(count)
+        ] + ["not an object"]  # Skipped without losing the rest of the chunk
+        return MagicMock(choices=[MagicMock(message=MagicMock(content=json.dumps({"results": results})))])
+    
+    with pytest.raises(ValueError):
+        parser.parse_email_multi(emails, chunk_size=0)
+    
+    # The first email is already cached by a single-email parse
+    parser.parse_email(emails[0])
+    with patch.object(create, "side_effect", multi_response):
+        create.reset_mock()
+        results = parser.parse_email_multi(emails, chunk_size=2)
+        assert create.call_count == 2
+        assert [result.parsed_expense.description for result in results[1:]] == ["Taxi 0", "Taxi 1", "Taxi 0", "Taxi 1"]
+        assert results[0].parsed_expense.description == "Dinner at Pizza Palace"
+        
+        # Every email is cached now, so nothing is sent again
+        assert parser.parse_email_multi(emails, chunk_size=2) == results
+        assert create.call_count == 2
+
+class _FakeStream:
+    """Async chat completion stream yielding content chunks, optionally failing midway."""
+    
+    def __init__(self, parts, error=None):
+        self.parts = parts
+        self.error = error
+        self.closed = False
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.closed = True
+    
+    async def __aiter__(self):
+        for part in self.parts:
+            yield MagicMock(choices=[MagicMock(delta=MagicMock(content=part))])
+        if self.error is not None:
+            raise self.error
+
+def test_async_stream_retry(mock_config, monkeypatch):
+    """Test that a stream failing midway is closed and the whole request retried."""
+    monkeypatch.setattr("email_parser.RETRY_BASE_DELAY", 0)
+    content = json.dumps({"parsed_expense": {"description": "Taxi", "amount": 28.5}, "confidence": 0.8})
+    half = len(content) // 2
+    streams = [
+        _FakeStream([content[:half]], error=httpx.ReadTimeout("timed out")),
+        _FakeStream([content[:half], content[half:]])
+    ]
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock(side_effect=streams)
+    parser = EmailParser()
+    
+    async def parse():
+        with patch.object(EmailParser, "async_client", client):
+            return await parser.parse_email_async(_SAMPLE_EMAIL)
+    
+    result = asyncio.run(parse())
+    
+    assert result.parsed_expense.description == "Taxi"
+    assert client.chat.completions.create.await_count == 2
+    assert all(stream.closed for stream in streams)
+
+def test_non_json_response_is_logged(mock_config, caplog):
+    """Test that a 2xx body that is not JSON raises ValueError and logs the body."""
+    response = requests.Response()
+    response.status_code = 200
+    response._content = b"<html>Service maintenance</html>"
+    
+    with SplitwiseClient(access_token="token") as client, \
+            patch.object(client.session, "get", return_value=response), pytest.raises(ValueError):
+        client.get_groups()
+    
+    assert "<html>Service maintenance</html>" in caplog.text
+
+def test_parse_emails_batch(mock_config, mock_openai_client):
+    """Test that batch results come back in input order, with None for failed requests."""
+    parser = EmailParser()
+    emails = [EmailContent(subject="Taxi", body="Uber $28.50"), EmailContent(subject="Dinner", body="Pizza $45.67")]
+    parsed = {"parsed_expense": {"description": "Taxi", "amount": 28.5}, "confidence": 0.8}
+    
+    mock_openai_client.files.create.return_value = MagicMock(id="file-in")
+    mock_openai_client.batches.create.return_value = MagicMock(id="batch-3")
+    mock_openai_client.batches.retrieve.side_effect = [
+        MagicMock(id="batch-3", status="in_progress"),
+        MagicMock(id="batch-3", status="completed", output_file_id="file-out")
+    ]
+    mock_openai_client.files.content.return_value = MagicMock(text="\n".join([
+        json.dumps({"custom_id": "1", "response": {"status_code": 500, "body": {"error": "server error"}}}),
+        _batch_output_line("0", json.dumps(parsed))
+    ]))
+    
+    with patch("email_parser.time.sleep") as sleep:
+        results = parser.parse_emails_batch(emails)
+    sleep.assert_called_once_with(5.0)
+    
+    assert results[0].parsed_expense.description == "Taxi"
+    assert results[1] is None
+    assert mock_openai_client.batches.retrieve.call_count == 2
+    
+    uploaded = mock_openai_client.files.create.call_args.kwargs["file"][1].getvalue().decode().splitlines()
+    assert [json.loads(line)["custom_id"] for line in uploaded] == ["0", "1"]
+    
+    # An empty batch is rejected before anything is uploaded
+    with pytest.raises(ValueError):
+        parser.submit_batch({})
+    with pytest.raises(ValueError):
+        parser.wait_for_batch("batch-3", poll_interval=0)
+    
+    # Requests that finished before a batch expired are still collected
+    expired = MagicMock(id="batch-4", status="expired", output_file_id="file-out")
+    assert list(parser.collect_batch_results(expired)) == ["0"]
+    for status, output_file_id in (("failed", "file-out"), ("cancelled", None)):
+        with pytest.raises(ValueError):
+            parser.collect_batch_results(MagicMock(id="batch-5", status=status, output_file_id=output_file_id))
+
+def test_parse_emails_concurrent(mock_config):
+    """Test that concurrent parsing is bounded and keeps input order, returning failures in place."""
+    in_flight = 0
+    max_in_flight = 0
+    
+    async def create(**request):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        
+        subject = request["messages"][-1]["content"].split("EMAIL SUBJECT: ")[1].split("\n")[0]
+        if subject == "Broken":
+            raise ValueError("unexpected response")
+        content = json.dumps({"parsed_expense": {"description": subject, "amount": 10}, "confidence": 0.8})
+        return _FakeStream([content])
+    
+    client = MagicMock()
+    client.chat.completions.create = create
+    parser = EmailParser()
+    subjects = ["Taxi", "Dinner", "Broken", "Coffee", "Groceries"]
+    emails = [EmailContent(subject=subject, body="Paid $10") for subject in subjects]
+    
+    async def parse():
+        with patch.object(EmailParser, "async_client", client):
+            return await parser.parse_emails_concurrent(emails, max_concurrent=2)
+    
+    results = asyncio.run(parse())
+    
+    assert max_in_flight == 2
+    assert isinstance(results[2], ValueError)
+    assert [result.parsed_expense.description for result in results if not isinstance(result, Exception)] == \
+        ["Taxi", "Dinner", "Coffee", "Groceries"]
+
+def test_process_email_async(mock_config):
+    """Test that an email is parsed and its expense created over the async Splitwise client."""
+    posted = []
+    
+    def handler(request):
+        posted.append(json.loads(request.content))
+        assert request.url.path.endswith("/create_expense")
+        return httpx.Response(200, json={"expenses": [{"id": 42}], "errors": {}})
+    
+    with patch.object(SplitwiseClient, "get_current_user", return_value={"user": {"id": 1}}):
+        forwarder = ExpenseForwarder(access_token="test-access-token")
+    forwarder.splitwise_client.get_categories = MagicMock(return_value=[])
+    forwarder.email_parser = MagicMock(aclose=AsyncMock(), parse_email_async=AsyncMock(return_value=OpenAIResponse(
+        parsed_expense=ParsedExpense(description="Taxi", amount=28.5), confidence=0.8)))
+    
+    async def process():
+        try:
+            return await forwarder.process_email_async("Uber Receipt", "Uber ride $28.50", group_id=12345)
+        finally:
+            await forwarder.aclose()
+    
+    with patch("main.create_async_splitwise_client", side_effect=lambda token, auth_client: _mock_async_client(
+            handler, token, auth_client)):
+        result = asyncio.run(process())
+    
+    assert result["success"] is True
+    assert result["expense_id"] == 42
+    assert posted == [{"cost": "28.50", "description": "Taxi", "currency_code": "USD",
+                       "group_id": 12345, "split_equally": True}]
+    assert forwarder._async_splitwise_client is None
+
+def test_info_bundle(mock_config):
+    """Test that user, friends, groups and categories are fetched together, in that order."""
+    payloads = {
+        "get_current_user": {"user": {"id": 1, "first_name": "Mike"}},
+        "get_friends": {"friends": [{"id": 2}]},
+        "get_groups": {"groups": [{"id": 3}]},
+        "get_categories": {"categories": [{"id": 4}]}
+    }
+    
+    def handler(request):
+        return httpx.Response(200, json=payloads[request.url.path.rsplit("/", 1)[-1]])
+    
+    with patch.object(SplitwiseClient, "get_current_user", return_value={"user": {"id": 1}}):
+        forwarder = ExpenseForwarder(access_token="test-access-token")
+    
+    with patch("main.create_async_splitwise_client", side_effect=lambda token, auth_client: _mock_async_client(
+            handler, token, auth_client)):
+        user, friends, groups, categories = asyncio.run(_fetch_info_bundle(forwarder))
+    
+    assert user == payloads["get_current_user"]
+    assert (friends, groups, categories) == ([{"id": 2}], [{"id": 3}], [{"id": 4}])
+    assert forwarder._async_splitwise_client is None
+    
+    forwarder.splitwise_client.access_token = None
+    with pytest.raises(ValueError):
+        asyncio.run(forwarder.info_bundle())
+
+def test_rejected_explicit_token_keeps_stored_tokens(mock_config, token_store):
+    """Test that a rejected explicitly given token does not clear the user's stored tokens."""
+    tokens = {"access_token": "stored", "refresh_token": "refresh", "expires_at": None}
+    token_store.save(tokens)
+    
+    with patch("main.create_token_store", return_value=token_store), \
+            patch.object(requests.Session, "get", return_value=_error_response(401)):
+        forwarder = ExpenseForwarder(access_token="typo")
+    
+    assert forwarder.expense_converter is None
+    assert token_store.load() == tokens
+
+def test_local_lookups(mock_config):
+    """Test that categories and friends resolve through indexes built once per cache refresh."""
+    categories = [
+        {"id": 12, "name": "Food and drink", "subcategories": [{"id": 13, "name": "Dining out"}, {"id": 14, "name": "Other"}]}
+    ]
+    friends = [{"id": 2, "first_name": "John", "last_name": "Smith", "email": "John@example.com"}]
+    
+    with SplitwiseClient(access_token="token") as client, \
+            patch.object(client, "get_categories", return_value=categories) as get_categories, \
+            patch.object(client, "get_friends", return_value=friends) as get_friends:
+        assert client.find_category_by_name(" Dining Out ") == 13
+        assert client.find_category_by_name("Food and drink") == 14  # Parent resolves to its "Other"
+        assert client.find_category_by_name("Travel") is None
+        get_categories.assert_called_once()
+        
+        for identifier in ("john@example.com", "john", "Smith", "John Smith"):
+            assert client.find_user_by_name_or_email(identifier) == friends[0], identifier
+        get_friends.assert_called_once()
+        
+        # The converter falls back to the index when OpenAI resolved no category ID
+        with patch.object(client, "get_current_user", return_value={"user": {"id": 1}}):
+            converter = create_expense_converter(client)
+        expense = converter.convert_to_splitwise_expense(
+            ParsedExpense(description="Dinner", amount=45.67, category="Dining out"), 12345)
+        assert expense.category_id == 13
+
+def test_concurrency_limits_must_be_positive(mock_config, monkeypatch):
+    """Test that limits which would make requests wait forever are rejected."""
+    with pytest.raises(ValueError):
+        asyncio.run(EmailParser().parse_emails_concurrent([_SAMPLE_EMAIL], max_concurrent=0))
+    
+    monkeypatch.setattr(Config, "OPENAI_MAX_TOKENS_PER_MINUTE", 0)
+    with pytest.raises(ValueError):
+        EmailParser()
 
-if __name__ == "__main__":
-    main() 
\ No newline at end of file
+@pytest.mark.parametrize(
+    "amount, expected",
+    [(2.675, "2.68"), (1.005, "1.01"), (0.125, "0.13"), (67.5, "67.50"), (10, "10.00"), (1234.5649, "1234.56")],
+    ids=["2.675", "1.005", "0.125", "one_decimal", "integer", "rounds_down"]
+)
+def test_format_amount(amount, expected):
+    """Test that amounts round half up in decimal, without binary float artifacts."""
+    assert format_amount(amount) == expected
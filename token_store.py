@@ -0,0 +1,66 @@
+"""Persistent storage for Splitwise OAuth tokens."""
+
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from config import config
+from private_file import write_private_file
+
+logger = logging.getLogger(__name__)
+
+# Tokens this close to expiry are treated as already expired
+EXPIRY_MARGIN_SECONDS = 60
+
+class TokenStore:
+    """Stores OAuth tokens as JSON in a file readable only by the current user."""
+
+    def __init__(self, path: Optional[str] = None):
+        """Initialize the token store."""
+        self.path = Path(path or config.TOKEN_STORE_PATH).expanduser()
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Load stored tokens, or None if nothing usable is stored."""
+        try:
+            with open(self.path, 'r') as token_file:
+                tokens = json.load(token_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read stored tokens from {self.path}: {e}")
+            return None
+
+        if not isinstance(tokens, dict) or not tokens.get('access_token'):
+            logger.warning(f"Ignoring invalid token file: {self.path}")
+            return None
+
+        return tokens
+
+    def save(self, tokens: Dict[str, Any]):
+        """Save tokens, replacing the file atomically with mode 0600."""
+        write_private_file(self.path, json.dumps(tokens))
+
+        logger.info(f"Saved Splitwise tokens to {self.path}")
+
+    def clear(self):
+        """Delete stored tokens."""
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def is_expired(tokens: Dict[str, Any], margin: float = EXPIRY_MARGIN_SECONDS) -> bool:
+        """Check whether tokens are expired or about to expire.
+
+        Tokens without an expiry time never expire.
+        """
+        expires_at = tokens.get('expires_at')
+        return expires_at is not None and time.time() >= expires_at - margin
+
+# Factory function for creating token store instance
+def create_token_store(path: Optional[str] = None) -> TokenStore:
+    """Create and return a TokenStore instance."""
+    return TokenStore(path=path)